@@ -0,0 +1,71 @@
+"""
+JWT-аутентификация с кэшированием пользователя
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+USER_CACHE_KEY = 'auth_user:{}'
+# Сериализованный профиль (UserSerializer) для ответов входа и GET /me/
+USER_PROFILE_CACHE_KEY = 'user_profile:{}'
+
+# Поля пользователя, которые хранятся в кэше. Хэша пароля здесь нет: в кэш попадают
+# только значения этих колонок, остальные поля восстановленного экземпляра отложены
+# (deferred) и при обращении догружаются из БД, а save() пишет только загруженные поля
+USER_CACHE_FIELDS = frozenset({
+    'id', 'email', 'username', 'display_name', 'photo_url', 'provider',
+    'phone_number', 'email_verified', 'is_active', 'is_staff', 'is_superuser',
+    'created_at', 'updated_at', 'last_login_at',
+    'age', 'gender', 'country', 'language', 'timezone',
+    'notifications_enabled', 'biometric_enabled', 'theme',
+})
+
+
+def invalidate_cached_user(user_id) -> None:
+    """Удаляет пользователя из кэша аутентификации и его закэшированный профиль"""
+    cache.delete_many([USER_CACHE_KEY.format(user_id), USER_PROFILE_CACHE_KEY.format(user_id)])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication, который берёт пользователя из кэша вместо SELECT на каждый запрос.
+    В кэше лежат значения USER_CACHE_FIELDS, а не сам объект User.
+    Запись сбрасывается сигналом при сохранении/удалении пользователя.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        cache_key = USER_CACHE_KEY.format(user_id)
+        field_names = self.cached_field_names()
+        values = cache.get(cache_key)
+        if values is None:
+            # Промах: полная проверка базового класса (существование, is_active)
+            user = super().get_user(validated_token)
+            cache.set(
+                cache_key,
+                [getattr(user, name) for name in field_names],
+                settings.USER_CACHE_TIMEOUT
+            )
+            return user
+
+        user = self.user_model.from_db(router.db_for_read(self.user_model), field_names, values)
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        return user
+
+    def cached_field_names(self):
+        """Кэшируемые поля в порядке concrete_fields — этого порядка ждёт Model.from_db()"""
+        return [
+            field.attname for field in self.user_model._meta.concrete_fields
+            if field.attname in USER_CACHE_FIELDS
+        ]
@@ -3,13 +3,104 @@
 Использует fuzzy matching и алгоритмы схожести строк
 """
 
-from difflib import SequenceMatcher
-from typing import List, Dict, Tuple, Optional
+from collections import defaultdict
+from functools import lru_cache
+from typing import FrozenSet, Iterable, List, Dict, Tuple, Optional
 import re
-from django.db.models import Q
+import uuid
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.db.models import Exists, FloatField, Max, OuterRef, Q, Value
+from django.db.models.functions import Coalesce, Greatest
+from rapidfuzz import fuzz, process
+from rapidfuzz.distance import JaroWinkler
 from .models import Exercise, ExerciseAlias
 
 
+def aliases_by_exercise(exercise_ids: Iterable) -> Dict[object, List[str]]:
+    """Алиасы упражнений одним запросом, сгруппированные по exercise_id"""
+    grouped = defaultdict(list)
+    rows = ExerciseAlias.objects.filter(exercise_id__in=exercise_ids).values_list('exercise_id', 'alias')
+    for exercise_id, alias in rows:
+        grouped[exercise_id].append(alias)
+    return grouped
+
+
+# Базовые скореры схожести (настройка EXERCISE_MATCH_SCORER):
+# имя -> (функция rapidfuzz, шкала результата, есть ли верхняя оценка по длинам строк)
+BASE_SCORERS = {
+    'indel': (fuzz.ratio, 100.0, True),
+    'jaro_winkler': (JaroWinkler.normalized_similarity, 1.0, False),
+}
+
+
+def get_base_scorer() -> Tuple:
+    """Текущий базовый скорер; неизвестное значение настройки трактуется как indel"""
+    name = getattr(settings, 'EXERCISE_MATCH_SCORER', 'indel')
+    return BASE_SCORERS.get(name, BASE_SCORERS['indel'])
+
+
+def base_score(text1: str, text2: str) -> float:
+    """Базовая схожесть двух строк от 0 до 1"""
+    scorer, scale, _ = get_base_scorer()
+    return scorer(text1, text2) / scale
+
+
+# Паттерны нормализации текста
+PUNCTUATION_RE = re.compile(r'[^\w\s-]')
+SPACES_RE = re.compile(r'\s+')
+
+
+# Кэш нормализованных вариантов названий (сбрасывается сигналами Exercise/ExerciseAlias)
+VARIANT_INDEX_CACHE_KEY = 'exercise_variants:v2:{}'
+VARIANT_INDEX_NAMES = ('quick:ru', 'quick:en', 'match')
+
+# Версия данных упражнений: часть ключа in-process кэша результатов поиска
+MATCH_CACHE_VERSION_KEY = 'exercise_variants:version'
+
+
+def get_variant_index_timeout() -> int:
+    """
+    Время жизни индексов и версии в кэше. Конечное: сигналы не видят
+    QuerySet.update(), bulk_create() и правки из других процессов при LocMem-кэше,
+    поэтому устаревшие данные живут не дольше этого срока
+    """
+    return getattr(settings, 'EXERCISE_INDEX_CACHE_TIMEOUT', 300)
+
+
+def get_variant_index(name: str, build) -> Dict[str, list]:
+    """Индекс вариантов {exercise_id: [...]} из кэша, при промахе строится через build()"""
+    key = VARIANT_INDEX_CACHE_KEY.format(name)
+    index = cache.get(key)
+    if index is None:
+        index = build()
+        cache.set(key, index, get_variant_index_timeout())
+    return index
+
+
+def get_match_cache_version() -> str:
+    """Текущая версия данных упражнений (общая для всех процессов через кэш)"""
+    return cache.get_or_set(MATCH_CACHE_VERSION_KEY, lambda: uuid.uuid4().hex, get_variant_index_timeout())
+
+
+def is_shared_cache() -> bool:
+    """
+    Общий ли кэш для всех процессов. У LocMem версия живёт в памяти процесса,
+    и сброс в одном воркере не виден другим — in-process кэш результатов тогда не используется
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def invalidate_variant_index():
+    """Сброс всех индексов нормализованных вариантов и кэша результатов поиска"""
+    cache.delete_many([VARIANT_INDEX_CACHE_KEY.format(name) for name in VARIANT_INDEX_NAMES])
+    cache.set(MATCH_CACHE_VERSION_KEY, uuid.uuid4().hex, get_variant_index_timeout())
+
+
 class QuickExerciseMatcher:
     """Быстрое сопоставление упражнений для UI с 1-3 карточками"""
     
@@ -18,15 +109,19 @@ class QuickExerciseMatcher:
     GOOD_THRESHOLD = 0.75      # Хорошее совпадение
     SUGGEST_THRESHOLD = 0.5    # Минимальный порог для показа
     
+    # Максимальная сумма бонусов в calculate_similarity
+    MAX_BONUS = 0.35
+    
     # Стоп-слова
-    STOP_WORDS_RU = {'упражнение', 'на', 'для', 'с', 'и', 'в', 'по'}
-    STOP_WORDS_EN = {'exercise', 'for', 'with', 'on', 'the', 'and', 'a'}
+    STOP_WORDS_RU = frozenset({'упражнение', 'на', 'для', 'с', 'и', 'в', 'по'})
+    STOP_WORDS_EN = frozenset({'exercise', 'for', 'with', 'on', 'the', 'and', 'a'})
     
     @classmethod
+    @lru_cache(maxsize=4096)
     def normalize_text(cls, text: str, language: str = 'ru') -> str:
-        """Нормализация текста"""
-        text = text.lower().strip()
-        text = re.sub(r'[^\w\s-]', '', text)
+        """Нормализация текста (мемоизирована: популярные названия повторяются у разных пользователей)"""
+        # strip не нужен: split() ниже сам отбрасывает крайние пробелы
+        text = PUNCTUATION_RE.sub('', text.lower())
         
         # Убираем стоп-слова
         stop_words = cls.STOP_WORDS_RU if language == 'ru' else cls.STOP_WORDS_EN
@@ -36,9 +131,21 @@ class QuickExerciseMatcher:
         return ' '.join(words)
     
     @classmethod
-    def calculate_similarity(cls, text1: str, text2: str) -> float:
-        """Вычисление схожести с бонусами"""
-        base_sim = SequenceMatcher(None, text1, text2).ratio()
+    def calculate_similarity(
+        cls,
+        text1: str,
+        text2: str,
+        base_sim: Optional[float] = None,
+        words1: Optional[FrozenSet[str]] = None,
+        words2: Optional[FrozenSet[str]] = None
+    ) -> float:
+        """
+        Вычисление схожести с бонусами
+        base_sim, words1 и words2 можно передать, если они уже посчитаны
+        (базовый скорер в process.extract, наборы слов в индексе вариантов)
+        """
+        if base_sim is None:
+            base_sim = base_score(text1, text2)
         bonus = 0.0
         
         # Точное вхождение
@@ -53,14 +160,69 @@ class QuickExerciseMatcher:
                 bonus += 0.1
         
         # Совпадение слов
-        words1 = set(text1.split())
-        words2 = set(text2.split())
+        if words1 is None:
+            words1 = frozenset(text1.split())
+        if words2 is None:
+            words2 = frozenset(text2.split())
         if words1 and words2:
-            word_overlap = len(words1 & words2) / len(words1 | words2)
+            common = len(words1 & words2)
+            word_overlap = common / (len(words1) + len(words2) - common)
             bonus += word_overlap * 0.1
         
         return min(1.0, base_sim + bonus)
     
+    @classmethod
+    def exercise_variants(
+        cls,
+        name: str,
+        name_ru: str,
+        aliases: List[str],
+        language: str
+    ) -> List[Tuple[str, FrozenSet[str]]]:
+        """Нормализованные варианты названия упражнения и их наборы слов"""
+        variants = []
+        
+        if language == 'ru':
+            if name_ru:
+                variants.append(cls.normalize_text(name_ru, 'ru'))
+            variants.append(cls.normalize_text(name, 'en'))
+        else:
+            variants.append(cls.normalize_text(name, 'en'))
+            if name_ru:
+                variants.append(cls.normalize_text(name_ru, 'ru'))
+        
+        # Алиасы
+        for alias in aliases:
+            variants.append(cls.normalize_text(alias, language))
+        
+        return [(variant, frozenset(variant.split())) for variant in variants]
+    
+    @classmethod
+    def variant_index(cls, language: str) -> Dict[str, List[Tuple[str, FrozenSet[str]]]]:
+        """Кэшированные нормализованные варианты всех активных упражнений"""
+        def build():
+            exercises = list(Exercise.objects.filter(is_active=True).values_list('id', 'name', 'name_ru'))
+            aliases = aliases_by_exercise([row[0] for row in exercises])
+            return {
+                str(exercise_id): cls.exercise_variants(name, name_ru, aliases[exercise_id], language)
+                for exercise_id, name, name_ru in exercises
+            }
+        
+        return get_variant_index(f'quick:{language}', build)
+    
+    @classmethod
+    def length_band(cls, length: int) -> Tuple[float, float]:
+        """
+        Допустимый диапазон длин варианта для строки длины length.
+        Indel-схожесть не превышает 2*min/(len1+len2), поэтому варианты вне
+        диапазона не наберут SUGGEST_THRESHOLD даже с максимальными бонусами.
+        Для скореров без такой оценки (Jaro-Winkler) диапазон не ограничен.
+        """
+        k = max(0.0, cls.SUGGEST_THRESHOLD - cls.MAX_BONUS)
+        if k == 0.0 or not get_base_scorer()[2]:
+            return 0.0, float('inf')
+        return length * k / (2 - k), length * (2 - k) / k
+    
     @classmethod
     def find_matches(
         cls,
@@ -68,77 +230,150 @@ class QuickExerciseMatcher:
         language: str = 'ru',
         max_results: int = 3
     ) -> List[Dict]:
-        """Быстрый поиск упражнений"""
+        """
+        Быстрый поиск упражнений
+        Повторяющиеся запросы отдаются из in-process LRU кэша; ключ включает
+        версию данных, которая меняется при изменении упражнений и алиасов
+        и истекает через EXERCISE_INDEX_CACHE_TIMEOUT. Без общего кэша LRU не используется
+        """
+        if not is_shared_cache():
+            return cls.find_matches_uncached(text.lower().strip(), language, max_results)
+        matches = _cached_quick_matches(get_match_cache_version(), text.lower().strip(), language, max_results)
+        return [dict(match) for match in matches]
+    
+    @classmethod
+    def find_matches_uncached(
+        cls,
+        text: str,
+        language: str = 'ru',
+        max_results: int = 3
+    ) -> List[Dict]:
+        """Быстрый поиск упражнений без кэша результатов"""
         normalized_input = cls.normalize_text(text, language)
         
-        # Оптимизированный поиск в БД
-        field = 'name_ru__icontains' if language == 'ru' else 'name__icontains'
-        exercises = Exercise.objects.filter(
-            **{field: text.lower()},
-            is_active=True
-        ).prefetch_related('aliases')[:20]
-        
-        # Расширенный поиск если не найдено
-        if not exercises.exists():
-            exercises = Exercise.objects.filter(
-                Q(aliases__alias__icontains=text.lower()) |
-                Q(name__icontains=text.lower()) |
-                Q(name_ru__icontains=text.lower()),
-                is_active=True
-            ).distinct().prefetch_related('aliases')[:20]
-        
-        # Полный поиск если всё ещё пусто
-        if not exercises.exists():
-            exercises = Exercise.objects.filter(
-                is_active=True
-            ).prefetch_related('aliases')[:100]
+        # Один запрос по названиям и алиасам вместо цепочки exists() + повторных запросов
+        query = text.lower()
+        base_query = Exercise.objects.filter(is_active=True).only(
+            'id', 'name', 'name_ru', 'category', 'difficulty',
+            'image_url_main', 'image_url_secondary', 'description',
+        )
+        if connection.vendor == 'postgresql':
+            # Короткий список по триграммам (GIN-индексы pg_trgm), лучшие кандидаты первыми.
+            # Порядок — по лучшей схожести названий или любого из алиасов: упражнение,
+            # найденное только по алиасу, не должно отсекаться срезом [:20]
+            alias_similar = ExerciseAlias.objects.filter(
+                exercise=OuterRef('pk'),
+                alias__trigram_word_similar=query,
+            )
+            exercises = list(
+                base_query.annotate(
+                    trigram_similarity=Greatest(
+                        TrigramWordSimilarity(query, 'name_ru'),
+                        TrigramWordSimilarity(query, 'name'),
+                        Coalesce(
+                            Max(TrigramWordSimilarity(query, 'aliases__alias')),
+                            Value(0.0),
+                            output_field=FloatField(),
+                        ),
+                    )
+                ).filter(
+                    Q(name_ru__trigram_word_similar=query) |
+                    Q(name__trigram_word_similar=query) |
+                    Exists(alias_similar)
+                ).order_by('-trigram_similarity')[:20]
+            )
+        else:
+            exercises = list(
+                base_query.filter(
+                    Q(name_ru__icontains=query) |
+                    Q(name__icontains=query) |
+                    Q(aliases__alias__icontains=query)
+                ).distinct()[:20]
+            )
+        
+        # Полный поиск если ничего не найдено
+        if not exercises:
+            exercises = list(base_query[:100])
+        
+        index = cls.variant_index(language)
+        missing = [exercise.id for exercise in exercises if str(exercise.id) not in index]
+        aliases = aliases_by_exercise(missing) if missing else {}
+        
+        # Плоский список вариантов для всех упражнений
+        choices = []
+        tokens = []
+        owners = []
+        min_len, max_len = cls.length_band(len(normalized_input))
+        input_words = frozenset(normalized_input.split())
+        
+        for idx, exercise in enumerate(exercises):
+            variants = index.get(str(exercise.id))
+            if variants is None:
+                variants = cls.exercise_variants(exercise.name, exercise.name_ru, aliases[exercise.id], language)
+            
+            for variant, words in variants:
+                if min_len <= len(variant) <= max_len:
+                    choices.append(variant)
+                    tokens.append(words)
+                    owners.append(idx)
+        
+        # Предварительный отбор одним вызовом rapidfuzz: бонусы не больше MAX_BONUS,
+        # поэтому варианты ниже этой границы не пройдут порог в любом случае
+        scorer, scale, _ = get_base_scorer()
+        candidates = process.extract(
+            normalized_input,
+            choices,
+            scorer=scorer,
+            score_cutoff=round(max(0.0, cls.SUGGEST_THRESHOLD - cls.MAX_BONUS) * scale, 6),
+            limit=None
+        )
+        
+        # Максимальная схожесть по каждому упражнению
+        best = {}
+        for variant, score, choice_idx in sorted(candidates, key=lambda c: c[2]):
+            similarity = cls.calculate_similarity(
+                normalized_input,
+                variant,
+                base_sim=score / scale,
+                words1=input_words,
+                words2=tokens[choice_idx]
+            )
+            idx = owners[choice_idx]
+            if idx not in best or similarity > best[idx][0]:
+                best[idx] = (similarity, variant)
+        
+        # Сортируем и ограничиваем, словари собираем только для оставшихся
+        ranked = [
+            (round(max_similarity, 3), idx, best_variant)
+            for idx, (max_similarity, best_variant) in best.items()
+            if max_similarity >= cls.SUGGEST_THRESHOLD
+        ]
+        ranked.sort(key=lambda r: r[0], reverse=True)
         
         matches = []
         
-        for exercise in exercises:
-            variants = []
-            
-            # Добавляем варианты для сравнения
-            if language == 'ru':
-                if exercise.name_ru:
-                    variants.append(cls.normalize_text(exercise.name_ru, 'ru'))
-                variants.append(cls.normalize_text(exercise.name, 'en'))
-            else:
-                variants.append(cls.normalize_text(exercise.name, 'en'))
-                if exercise.name_ru:
-                    variants.append(cls.normalize_text(exercise.name_ru, 'ru'))
-            
-            # Алиасы
-            for alias in exercise.aliases.all():
-                variants.append(cls.normalize_text(alias.alias, language))
-            
-            # Максимальная схожесть
-            max_similarity = 0.0
-            best_variant = exercise.name
-            
-            for variant in variants:
-                similarity = cls.calculate_similarity(normalized_input, variant)
-                if similarity > max_similarity:
-                    max_similarity = similarity
-                    best_variant = variant
-            
-            if max_similarity >= cls.SUGGEST_THRESHOLD:
-                matches.append({
-                    'id': str(exercise.id),
-                    'name': exercise.name,
-                    'name_ru': exercise.name_ru or '',
-                    'matched_variant': best_variant,
-                    'similarity': round(max_similarity, 3),
-                    'category': exercise.category,
-                    'difficulty': exercise.difficulty,
-                    'image_main': exercise.image_url_main or '',
-                    'image_secondary': exercise.image_url_secondary or '',
-                    'description_short': exercise.description[:150] + '...' if len(exercise.description) > 150 else exercise.description,
-                })
-        
-        # Сортируем и ограничиваем
-        matches.sort(key=lambda x: x['similarity'], reverse=True)
-        return matches[:max_results]
+        for similarity, idx, best_variant in ranked[:max_results]:
+            exercise = exercises[idx]
+            matches.append({
+                'id': str(exercise.id),
+                'name': exercise.name,
+                'name_ru': exercise.name_ru or '',
+                'matched_variant': best_variant,
+                'similarity': similarity,
+                'category': exercise.category,
+                'difficulty': exercise.difficulty,
+                'image_main': exercise.image_url_main or '',
+                'image_secondary': exercise.image_url_secondary or '',
+                'description_short': exercise.description[:150] + '...' if len(exercise.description) > 150 else exercise.description,
+            })
+        
+        return matches
+
+
+@lru_cache(maxsize=2048)
+def _cached_quick_matches(version: str, text: str, language: str, max_results: int) -> Tuple[Dict, ...]:
+    """Кэшированный результат QuickExerciseMatcher (version участвует только в ключе)"""
+    return tuple(QuickExerciseMatcher.find_matches_uncached(text, language, max_results))
 
 
 class ExerciseMatcher:
@@ -153,10 +388,21 @@ class ExerciseMatcher:
     # Максимальное количество предложений
     MAX_SUGGESTIONS = 5
     
+    # Размер короткого списка кандидатов из pg_trgm
+    SHORTLIST_SIZE = MAX_SUGGESTIONS * 4
+    
+    # Подписи choices для строк из values()
+    CATEGORY_LABELS = dict(Exercise.Category.choices)
+    DIFFICULTY_LABELS = dict(Exercise.Difficulty.choices)
+    
+    # Максимальная сумма бонусов в calculate_similarity
+    MAX_BONUS = 0.15
+    
     @classmethod
+    @lru_cache(maxsize=4096)
     def normalize_text(cls, text: str) -> str:
         """
-        Нормализация текста для сравнения
+        Нормализация текста для сравнения (мемоизирована: популярные названия повторяются)
         - приведение к нижнему регистру
         - удаление лишних пробелов
         - удаление знаков препинания
@@ -168,10 +414,10 @@ class ExerciseMatcher:
         text = text.lower().strip()
         
         # Удаление знаков препинания (кроме пробелов и дефисов)
-        text = re.sub(r'[^\w\s\-]', '', text)
+        text = PUNCTUATION_RE.sub('', text)
         
         # Замена множественных пробелов на один
-        text = re.sub(r'\s+', ' ', text)
+        text = SPACES_RE.sub(' ', text)
         
         return text
     
@@ -179,19 +425,30 @@ class ExerciseMatcher:
     def calculate_similarity(cls, text1: str, text2: str) -> float:
         """
         Вычисление коэффициента схожести между двумя строками
-        Использует SequenceMatcher (алгоритм похожий на Levenshtein)
+        Использует rapidfuzz (Indel или Jaro-Winkler, см. EXERCISE_MATCH_SCORER)
         
         Returns:
             float: значение от 0 до 1, где 1 = полное совпадение
         """
-        norm_text1 = cls.normalize_text(text1)
-        norm_text2 = cls.normalize_text(text2)
-        
+        return cls.normalized_similarity(cls.normalize_text(text1), cls.normalize_text(text2))
+    
+    @classmethod
+    def normalized_similarity(
+        cls,
+        norm_text1: str,
+        norm_text2: str,
+        base_similarity: Optional[float] = None
+    ) -> float:
+        """
+        То же, что calculate_similarity, для уже нормализованных строк
+        base_similarity можно передать, если базовый скорер уже посчитан
+        """
         if not norm_text1 or not norm_text2:
             return 0.0
         
-        # Базовая схожесть через SequenceMatcher
-        base_similarity = SequenceMatcher(None, norm_text1, norm_text2).ratio()
+        # Базовая схожесть через rapidfuzz
+        if base_similarity is None:
+            base_similarity = base_score(norm_text1, norm_text2)
         
         # Бонус за точное вхождение подстроки
         substring_bonus = 0.0
@@ -255,6 +512,92 @@ class ExerciseMatcher:
         
         return params
     
+    @classmethod
+    def variant_index(cls) -> Dict[str, List[Tuple[str, str]]]:
+        """Кэшированные пары (вариант, нормализованный вариант) всех активных упражнений"""
+        def build():
+            exercises = list(Exercise.objects.filter(is_active=True).values_list('id', 'name'))
+            aliases = aliases_by_exercise([row[0] for row in exercises])
+            return {
+                str(exercise_id): [
+                    (variant, cls.normalize_text(variant))
+                    for variant in [name] + aliases[exercise_id]
+                ]
+                for exercise_id, name in exercises
+            }
+        
+        return get_variant_index('match', build)
+    
+    @classmethod
+    def length_band(cls, length: int) -> Tuple[float, float]:
+        """
+        Допустимый диапазон длин варианта для строки длины length.
+        Indel-схожесть не превышает 2*min/(len1+len2), поэтому варианты вне
+        диапазона не наберут SUGGEST_THRESHOLD даже с максимальными бонусами.
+        Для скореров без такой оценки (Jaro-Winkler) диапазон не ограничен.
+        """
+        k = max(0.0, cls.SUGGEST_THRESHOLD - cls.MAX_BONUS)
+        if k == 0.0 or not get_base_scorer()[2]:
+            return 0.0, float('inf')
+        return length * k / (2 - k), length * (2 - k) / k
+    
+    @classmethod
+    def rank_candidates(cls, normalized_input: str, exercises: List[Exercise]) -> List[Tuple[float, int, str]]:
+        """
+        Оценка кандидатов: [(схожесть, индекс в exercises, лучший вариант названия)]
+        по убыванию схожести, только прошедшие SUGGEST_THRESHOLD
+        """
+        index = cls.variant_index()
+        missing = [exercise.id for exercise in exercises if str(exercise.id) not in index]
+        aliases = aliases_by_exercise(missing) if missing else {}
+        
+        # Плоский список вариантов: название + все алиасы каждого упражнения
+        raw_variants = []
+        choices = []
+        owners = []
+        min_len, max_len = cls.length_band(len(normalized_input))
+        
+        for idx, exercise in enumerate(exercises):
+            variants = index.get(str(exercise.id))
+            if variants is None:
+                variants = [
+                    (variant, cls.normalize_text(variant))
+                    for variant in [exercise.name] + aliases[exercise.id]
+                ]
+            for variant, normalized_variant in variants:
+                if min_len <= len(normalized_variant) <= max_len:
+                    raw_variants.append(variant)
+                    choices.append(normalized_variant)
+                    owners.append(idx)
+        
+        # Предварительный отбор одним вызовом rapidfuzz по нормализованным вариантам
+        scorer, scale, _ = get_base_scorer()
+        candidates = process.extract(
+            normalized_input,
+            choices,
+            scorer=scorer,
+            score_cutoff=round(max(0.0, cls.SUGGEST_THRESHOLD - cls.MAX_BONUS) * scale, 6),
+            limit=None
+        )
+        
+        # Находим максимальную схожесть среди всех вариантов упражнения
+        best = {}
+        for normalized_variant, score, choice_idx in sorted(candidates, key=lambda c: c[2]):
+            variant = raw_variants[choice_idx]
+            similarity = cls.normalized_similarity(normalized_input, normalized_variant, score / scale)
+            idx = owners[choice_idx]
+            if idx not in best or similarity > best[idx][0]:
+                best[idx] = (similarity, variant)
+        
+        # Фильтруем по порогу и сортируем по убыванию схожести
+        ranked = [
+            (round(max_similarity, 3), idx, best_match_variant)
+            for idx, (max_similarity, best_match_variant) in best.items()
+            if max_similarity >= cls.SUGGEST_THRESHOLD
+        ]
+        ranked.sort(key=lambda r: r[0], reverse=True)
+        return ranked
+    
     @classmethod
     def find_matches(
         cls, 
@@ -281,59 +624,76 @@ class ExerciseMatcher:
         # Извлекаем параметры из текста
         extracted_params = cls.extract_parameters(recognized_text)
         
-        # Получаем все активные упражнения
-        exercises_query = Exercise.objects.filter(is_active=True)
+        # Получаем активные упражнения: для оценки схожести хватает id и названия,
+        # тяжёлые TEXT-колонки догружаем только для попавших в выдачу
+        exercises_query = Exercise.objects.filter(is_active=True).only('id', 'name')
         if category:
             exercises_query = exercises_query.filter(category=category)
         
-        exercises = exercises_query.prefetch_related('aliases')
+        ranked = []
+        if connection.vendor == 'postgresql':
+            # Короткий список по триграммам вместо полного перебора таблицы.
+            # Порядок — по лучшей схожести названия или любого из алиасов: упражнение,
+            # найденное только по алиасу, не должно вытесняться за SHORTLIST_SIZE
+            alias_similar = ExerciseAlias.objects.filter(
+                exercise=OuterRef('pk'),
+                alias__trigram_word_similar=normalized_input,
+            )
+            exercises = list(
+                exercises_query.annotate(
+                    trigram_similarity=Greatest(
+                        TrigramWordSimilarity(normalized_input, 'name'),
+                        Coalesce(
+                            Max(TrigramWordSimilarity(normalized_input, 'aliases__alias')),
+                            Value(0.0),
+                            output_field=FloatField(),
+                        ),
+                    )
+                ).filter(
+                    Q(name__trigram_word_similar=normalized_input) | Exists(alias_similar)
+                ).order_by('-trigram_similarity')[:cls.SHORTLIST_SIZE]
+            )
+            if exercises:
+                ranked = cls.rank_candidates(normalized_input, exercises)
+        
+        # Полный перебор, если короткий список недоступен, пуст
+        # или ни один кандидат из него не прошёл порог схожести
+        if not ranked:
+            exercises = list(exercises_query)
+            ranked = cls.rank_candidates(normalized_input, exercises)
+        
+        ranked = ranked[:cls.MAX_SUGGESTIONS]
+        full_rows = Exercise.objects.in_bulk([exercises[idx].id for _, idx, _ in ranked])
         
         matches = []
         
-        for exercise in exercises:
-            # Список вариантов для сравнения: название + все алиасы
-            variants = [exercise.name] + [alias.alias for alias in exercise.aliases.all()]
-            
-            # Находим максимальную схожесть среди всех вариантов
-            max_similarity = 0.0
-            best_match_variant = exercise.name
-            
-            for variant in variants:
-                similarity = cls.calculate_similarity(normalized_input, variant)
-                if similarity > max_similarity:
-                    max_similarity = similarity
-                    best_match_variant = variant
-            
-            # Фильтруем по порогу
-            if max_similarity >= cls.SUGGEST_THRESHOLD:
-                matches.append({
-                    'exercise_id': str(exercise.id),
-                    'name': exercise.name,
-                    'name_ru': exercise.name_ru or '',
-                    'matched_variant': best_match_variant,
-                    'category': exercise.category,
-                    'category_display': exercise.get_category_display(),
-                    'difficulty': exercise.difficulty,
-                    'difficulty_display': exercise.get_difficulty_display(),
-                    'description': exercise.description,
-                    'similarity_score': round(max_similarity, 3),
-                    'instructions': exercise.instructions,
-                    'duration_min': exercise.duration_min,
-                    'duration_max': exercise.duration_max,
-                    'repetitions': exercise.repetitions,
-                    'audio_url': exercise.audio_url,
-                    'video_url': exercise.video_url,
-                    'image_url_main': exercise.image_url_main,
-                    'image_url_secondary': exercise.image_url_secondary,
-                    'usage_count': exercise.usage_count,
-                    'extracted_params': extracted_params,
-                })
-        
-        # Сортируем по убыванию схожести
-        matches.sort(key=lambda x: x['similarity_score'], reverse=True)
-        
-        # Ограничиваем количество результатов
-        return matches[:cls.MAX_SUGGESTIONS]
+        # Словари собираем только для результатов, попавших в лимит
+        for similarity_score, idx, best_match_variant in ranked:
+            exercise = full_rows[exercises[idx].id]
+            matches.append({
+                'exercise_id': str(exercise.id),
+                'name': exercise.name,
+                'name_ru': exercise.name_ru or '',
+                'matched_variant': best_match_variant,
+                'category': exercise.category,
+                'category_display': cls.CATEGORY_LABELS.get(exercise.category, exercise.category),
+                'difficulty': exercise.difficulty,
+                'difficulty_display': cls.DIFFICULTY_LABELS.get(exercise.difficulty, exercise.difficulty),
+                'description': exercise.description,
+                'similarity_score': similarity_score,
+                'instructions': exercise.instructions,
+                'duration_min': exercise.duration_min,
+                'duration_max': exercise.duration_max,
+                'repetitions': exercise.repetitions,
+                'audio_url': exercise.audio_url,
+                'video_url': exercise.video_url,
+                'image_url_main': exercise.image_url_main,
+                'image_url_secondary': exercise.image_url_secondary,
+                'usage_count': exercise.usage_count,
+                'extracted_params': extracted_params,
+            })
+        
+        return matches
     
     @classmethod
     def get_best_match(
@@ -378,34 +738,39 @@ class ExerciseMatcher:
             exercises_query = exercises_query.filter(difficulty=difficulty)
         
         if query:
-            normalized_query = cls.normalize_text(query)
-            
-            # Поиск по названию, описанию и алиасам
+            # Поиск по названию, описанию и алиасам. Алиасы — через EXISTS, а не JOIN:
+            # без размножения строк и DISTINCT по широким текстовым колонкам
+            alias_match = ExerciseAlias.objects.filter(exercise=OuterRef('pk'), alias__icontains=query)
             exercises_query = exercises_query.filter(
                 Q(name__icontains=query) |
                 Q(description__icontains=query) |
-                Q(aliases__alias__icontains=query)
-            ).distinct()
+                Exists(alias_match)
+            )
         
-        exercises = exercises_query[:limit]
+        # Только нужные колонки, без создания экземпляров модели
+        rows = exercises_query.values(
+            'id', 'name', 'category', 'difficulty', 'description', 'instructions',
+            'duration_min', 'duration_max', 'repetitions', 'audio_url', 'video_url',
+            'usage_count',
+        )[:limit]
         
         results = []
-        for exercise in exercises:
+        for row in rows:
             results.append({
-                'exercise_id': str(exercise.id),
-                'name': exercise.name,
-                'category': exercise.category,
-                'category_display': exercise.get_category_display(),
-                'difficulty': exercise.difficulty,
-                'difficulty_display': exercise.get_difficulty_display(),
-                'description': exercise.description,
-                'instructions': exercise.instructions,
-                'duration_min': exercise.duration_min,
-                'duration_max': exercise.duration_max,
-                'repetitions': exercise.repetitions,
-                'audio_url': exercise.audio_url,
-                'video_url': exercise.video_url,
-                'usage_count': exercise.usage_count,
+                'exercise_id': str(row['id']),
+                'name': row['name'],
+                'category': row['category'],
+                'category_display': cls.CATEGORY_LABELS.get(row['category'], row['category']),
+                'difficulty': row['difficulty'],
+                'difficulty_display': cls.DIFFICULTY_LABELS.get(row['difficulty'], row['difficulty']),
+                'description': row['description'],
+                'instructions': row['instructions'],
+                'duration_min': row['duration_min'],
+                'duration_max': row['duration_max'],
+                'repetitions': row['repetitions'],
+                'audio_url': row['audio_url'],
+                'video_url': row['video_url'],
+                'usage_count': row['usage_count'],
             })
         
         return results
@@ -13,6 +13,41 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def build_trie_pattern(words) -> str:
+    """
+    Собирает альтернативу слов в виде префиксного дерева:
+    ['два', 'две', 'двух'] -> 'дв(?:а|е|ух)'
+    Движок re не объединяет общие префиксы сам, поэтому плоская
+    альтернатива из десятков слов перебирается ветка за веткой.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        is_word_end = '' in node
+        if len(branches) == 1 and not is_word_end:
+            return branches[0]
+        pattern = '(?:' + '|'.join(branches) + ')'
+        return pattern + '?' if is_word_end else pattern
+    
+    return build(trie)
+
+
+def build_keyword_alternation(words) -> str:
+    """
+    Альтернатива ключевых слов, от длинных к коротким:
+    "подходов" проверяется раньше "подход", порядок не зависит от множества
+    """
+    return '|'.join(re.escape(word) for word in sorted(words, key=lambda word: (-len(word), word)))
+
+
 class ExerciseParser:
     """
     Парсер голосовых команд для упражнений
@@ -37,9 +72,36 @@ class ExerciseParser:
     }
     
     # Ключевые слова для параметров
-    SETS_KEYWORDS = ['подход', 'подхода', 'подходов', 'сет', 'сета', 'сетов']
-    REPS_KEYWORDS = ['раз', 'раза', 'повтор', 'повтора', 'повторение', 'повторения', 'повторений']
-    WEIGHT_KEYWORDS = ['кг', 'килограмм', 'килограмма', 'кило', 'грамм']
+    SETS_KEYWORDS = frozenset({'подход', 'подхода', 'подходов', 'сет', 'сета', 'сетов'})
+    REPS_KEYWORDS = frozenset({'раз', 'раза', 'повтор', 'повтора', 'повторение', 'повторения', 'повторений'})
+    WEIGHT_KEYWORDS = frozenset({'кг', 'килограмм', 'килограмма', 'кило', 'грамм'})
+    
+    # Альтернативы для регулярных выражений
+    _NUMBER_ALT = r'\d+|' + build_trie_pattern(NUMBER_WORDS)
+    _SETS_ALT = build_keyword_alternation(SETS_KEYWORDS)
+    _REPS_ALT = build_keyword_alternation(REPS_KEYWORDS)
+    _WEIGHT_ALT = build_keyword_alternation(WEIGHT_KEYWORDS)
+    
+    # Скомпилированные паттерны (собираются один раз при загрузке модуля)
+    _RE_TOTAL_SETS = re.compile(r'(' + _NUMBER_ALT + r')\s+(?:' + _SETS_ALT + r')\s*:')
+    _RE_GROUP_SPLIT = re.compile(r'\s+и\s+')
+    _RE_GROUP_OF_THEM = re.compile(
+        r'(' + _NUMBER_ALT + r')\s+(?:из\s+них|подход|подхода|подходов)\s+'
+        r'(' + _NUMBER_ALT + r')\s+(?:' + _REPS_ALT + r')\s+'
+        r'(?:по\s+)?(\d+(?:\.\d+)?)\s*(?:' + _WEIGHT_ALT + r')'
+    )
+    _RE_GROUP_PLAIN = re.compile(
+        r'(' + _NUMBER_ALT + r')\s+'
+        r'(' + _NUMBER_ALT + r')\s+(?:' + _REPS_ALT + r')\s+'
+        r'(?:по\s+)?(\d+(?:\.\d+)?)\s*(?:' + _WEIGHT_ALT + r')'
+    )
+    # Все поля простого шаблона за один проход: каждое совпадение —
+    # ровно одна из именованных групп sets / reps / weight
+    _RE_SIMPLE_FIELDS = re.compile(
+        r'(?P<sets>' + _NUMBER_ALT + r')\s+(?:' + _SETS_ALT + r')'
+        r'|(?P<reps>' + _NUMBER_ALT + r')\s+(?:' + _REPS_ALT + r')'
+        r'|(?P<weight>\d+(?:\.\d+)?)\s*(?:' + _WEIGHT_ALT + r')'
+    )
     
     @classmethod
     def parse(cls, text: str) -> Dict:
@@ -59,7 +121,7 @@ class ExerciseParser:
             }
         """
         text = text.lower().strip()
-        logger.info(f"Parsing exercise text: {text}")
+        logger.debug("Parsing exercise text: %s", text)
         
         result = {
             "exercise_name": "",
@@ -98,19 +160,19 @@ class ExerciseParser:
         - "приседания 4 подхода по 12 повторений с весом 60кг"
         - "становая тяга 3 сета по 5 раз 100 кило"
         """
-        # Паттерн: (название) (число) (подход*) (по/с/на) (число) (вес*) (на/по) (число) (раз*)
-        pattern = r'^(.+?)\s+(\d+|' + '|'.join(cls.NUMBER_WORDS.keys()) + r')\s+(?:' + '|'.join(cls.SETS_KEYWORDS) + r')'
-        
-        # Ищем количество подходов
-        sets_match = re.search(
-            r'(\d+|' + '|'.join(cls.NUMBER_WORDS.keys()) + r')\s+(?:' + '|'.join(cls.SETS_KEYWORDS) + r')',
-            text
-        )
-        
+        # Первое вхождение каждого поля за один проход по тексту
+        fields = {}
+        for match in cls._RE_SIMPLE_FIELDS.finditer(text):
+            if match.lastgroup not in fields:
+                fields[match.lastgroup] = match
+                if len(fields) == 3:
+                    break
+        
+        sets_match = fields.get('sets')
         if not sets_match:
             return None
         
-        sets_count = cls._extract_number(sets_match.group(1))
+        sets_count = cls._extract_number(sets_match.group('sets'))
         
         # Извлекаем название упражнения (всё до количества подходов)
         exercise_name = text[:sets_match.start()].strip()
@@ -118,11 +180,11 @@ class ExerciseParser:
         if not exercise_name:
             return None
         
-        # Ищем вес
-        weight = cls._extract_weight(text)
+        weight_match = fields.get('weight')
+        weight = float(weight_match.group('weight')) if weight_match else None
         
-        # Ищем количество повторений
-        reps = cls._extract_reps(text)
+        reps_match = fields.get('reps')
+        reps = cls._extract_number(reps_match.group('reps')) if reps_match else None
         
         # Создаём одинаковые подходы
         sets = []
@@ -146,11 +208,12 @@ class ExerciseParser:
         
         Пример: "жим 3 подхода: 2 из них 4 раза по 40кг и один 4 раза по 50кг"
         """
+        # Без двоеточия сложный шаблон невозможен — не запускаем поиск
+        if ':' not in text:
+            return None
+        
         # Ищем общее количество подходов
-        total_sets_match = re.search(
-            r'(\d+|' + '|'.join(cls.NUMBER_WORDS.keys()) + r')\s+(?:' + '|'.join(cls.SETS_KEYWORDS) + r')\s*:',
-            text
-        )
+        total_sets_match = cls._RE_TOTAL_SETS.search(text)
         
         if not total_sets_match:
             return None
@@ -162,7 +225,7 @@ class ExerciseParser:
         sets_description = text[total_sets_match.end():].strip()
         
         # Разбиваем по "и" для разных групп подходов
-        groups = re.split(r'\s+и\s+', sets_description)
+        groups = cls._RE_GROUP_SPLIT.split(sets_description)
         
         sets = []
         set_counter = 1
@@ -170,21 +233,11 @@ class ExerciseParser:
         for group in groups:
             # Ищем паттерн "X из них Y раз по Z кг" или "один Y раз по Z кг"
             # Паттерн 1: "X из них Y раз по Z кг"
-            group_match = re.search(
-                r'(\d+|' + '|'.join(cls.NUMBER_WORDS.keys()) + r')\s+(?:из\s+них|подход|подхода|подходов)\s+'
-                r'(\d+|' + '|'.join(cls.NUMBER_WORDS.keys()) + r')\s+(?:' + '|'.join(cls.REPS_KEYWORDS) + r')\s+'
-                r'(?:по\s+)?(\d+(?:\.\d+)?)\s*(?:' + '|'.join(cls.WEIGHT_KEYWORDS) + r')',
-                group
-            )
+            group_match = cls._RE_GROUP_OF_THEM.search(group)
             
             # Паттерн 2: "один/два/три Y раз по Z кг" (без "из них")
             if not group_match:
-                group_match = re.search(
-                    r'(\d+|' + '|'.join(cls.NUMBER_WORDS.keys()) + r')\s+'
-                    r'(\d+|' + '|'.join(cls.NUMBER_WORDS.keys()) + r')\s+(?:' + '|'.join(cls.REPS_KEYWORDS) + r')\s+'
-                    r'(?:по\s+)?(\d+(?:\.\d+)?)\s*(?:' + '|'.join(cls.WEIGHT_KEYWORDS) + r')',
-                    group
-                )
+                group_match = cls._RE_GROUP_PLAIN.search(group)
             
             if group_match:
                 count = cls._extract_number(group_match.group(1))
@@ -219,34 +272,6 @@ class ExerciseParser:
         # Затем ищем в словаре слов
         return cls.NUMBER_WORDS.get(text, 0)
     
-    @classmethod
-    def _extract_weight(cls, text: str) -> Optional[float]:
-        """Извлекает вес из текста"""
-        # Паттерн: число + (кг|килограмм|кило)
-        weight_match = re.search(
-            r'(\d+(?:\.\d+)?)\s*(?:' + '|'.join(cls.WEIGHT_KEYWORDS) + r')',
-            text
-        )
-        
-        if weight_match:
-            return float(weight_match.group(1))
-        
-        return None
-    
-    @classmethod
-    def _extract_reps(cls, text: str) -> Optional[int]:
-        """Извлекает количество повторений из текста"""
-        # Паттерн: число + (раз|повтор*)
-        reps_match = re.search(
-            r'(\d+|' + '|'.join(cls.NUMBER_WORDS.keys()) + r')\s+(?:' + '|'.join(cls.REPS_KEYWORDS) + r')',
-            text
-        )
-        
-        if reps_match:
-            return cls._extract_number(reps_match.group(1))
-        
-        return None
-    
     @classmethod
     def format_sets_summary(cls, sets: List[Dict]) -> str:
         """
@@ -3,119 +3,144 @@ Management команда для добавления алиасов к упра
 Запустить: python manage.py add_exercise_aliases
 """
 
+from typing import Dict, Tuple
+
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from authentication.exercise_matcher import invalidate_variant_index
 from authentication.models import Exercise, ExerciseAlias
 
 
+# Словарь: название упражнения -> кортеж алиасов
+ALIASES: Dict[str, Tuple[str, ...]] = {
+    'Диафрагмальное дыхание': (
+        'дыхание животом',
+        'глубокое дыхание',
+        'дыхательное упражнение',
+        'дыхание диафрагмой',
+        'брюшное дыхание',
+        'животное дыхание',
+    ),
+    'Дыхание 4-7-8': (
+        'дыхание четыре семь восемь',
+        'техника 4-7-8',
+        'упражнение 4 7 8',
+        'дыхание для сна',
+        'успокаивающее дыхание',
+    ),
+    'Прогрессивная мышечная релаксация': (
+        'прогрессивная релаксация',
+        'мышечная релаксация',
+        'пмр',
+        'напряжение и расслабление',
+        'расслабление мышц',
+    ),
+    'Медитация осознанности': (
+        'медитация',
+        'осознанная медитация',
+        'майндфулнес',
+        'mindfulness медитация',
+        'практика осознанности',
+        'концентрация на дыхании',
+    ),
+    'Сканирование тела': (
+        'бодискан',
+        'body scan',
+        'сканирование ощущений',
+        'осознание тела',
+        'путешествие по телу',
+    ),
+    'Визуализация безопасного места': (
+        'безопасное место',
+        'визуализация места',
+        'представь безопасность',
+        'воображаемое убежище',
+        'мысленное убежище',
+    ),
+    'Заземление 5-4-3-2-1': (
+        'заземление',
+        'техника 5 4 3 2 1',
+        'упражнение 54321',
+        'пять чувств',
+        'техника заземления',
+        'grounding',
+    ),
+    'Когнитивная реструктуризация': (
+        'реструктуризация мыслей',
+        'когнитивное упражнение',
+        'работа с мыслями',
+        'изменение мышления',
+        'переоценка мыслей',
+    ),
+    'Лёгкая растяжка': (
+        'растяжка',
+        'стретчинг',
+        'потягивание',
+        'разминка',
+        'упражнения на растяжку',
+        'мягкая растяжка',
+    ),
+    'Квадратное дыхание': (
+        'коробочное дыхание',
+        'дыхание квадратом',
+        'box breathing',
+        'дыхание 4-4-4-4',
+        'равномерное дыхание',
+    ),
+}
+
+
 class Command(BaseCommand):
     help = 'Добавляет начальные алиасы для упражнений'
     
-    # Словарь: название упражнения -> список алиасов
-    ALIASES = {
-        'Диафрагмальное дыхание': [
-            'дыхание животом',
-            'глубокое дыхание',
-            'дыхательное упражнение',
-            'дыхание диафрагмой',
-            'брюшное дыхание',
-            'животное дыхание',
-        ],
-        'Дыхание 4-7-8': [
-            'дыхание четыре семь восемь',
-            'техника 4-7-8',
-            'упражнение 4 7 8',
-            'дыхание для сна',
-            'успокаивающее дыхание',
-        ],
-        'Прогрессивная мышечная релаксация': [
-            'прогрессивная релаксация',
-            'мышечная релаксация',
-            'пмр',
-            'напряжение и расслабление',
-            'расслабление мышц',
-        ],
-        'Медитация осознанности': [
-            'медитация',
-            'осознанная медитация',
-            'майндфулнес',
-            'mindfulness медитация',
-            'практика осознанности',
-            'концентрация на дыхании',
-        ],
-        'Сканирование тела': [
-            'бодискан',
-            'body scan',
-            'сканирование ощущений',
-            'осознание тела',
-            'путешествие по телу',
-        ],
-        'Визуализация безопасного места': [
-            'безопасное место',
-            'визуализация места',
-            'представь безопасность',
-            'воображаемое убежище',
-            'мысленное убежище',
-        ],
-        'Заземление 5-4-3-2-1': [
-            'заземление',
-            'техника 5 4 3 2 1',
-            'упражнение 54321',
-            'пять чувств',
-            'техника заземления',
-            'grounding',
-        ],
-        'Когнитивная реструктуризация': [
-            'реструктуризация мыслей',
-            'когнитивное упражнение',
-            'работа с мыслями',
-            'изменение мышления',
-            'переоценка мыслей',
-        ],
-        'Лёгкая растяжка': [
-            'растяжка',
-            'стретчинг',
-            'потягивание',
-            'разминка',
-            'упражнения на растяжку',
-            'мягкая растяжка',
-        ],
-        'Квадратное дыхание': [
-            'коробочное дыхание',
-            'дыхание квадратом',
-            'box breathing',
-            'дыхание 4-4-4-4',
-            'равномерное дыхание',
-        ],
-    }
-    
     def handle(self, *args, **options):
         self.stdout.write('Добавление алиасов для упражнений...')
         
-        added_count = 0
-        skipped_count = 0
+        # Все упражнения из словаря одним IN-запросом
+        exercises_by_name = {
+            exercise.name: exercise
+            for exercise in Exercise.objects.filter(name__in=list(ALIASES), is_active=True)
+        }
+        
+        # Сообщения копим и выводим одной записью в конце
+        log = []
+        exercises = []
+        for exercise_name in ALIASES:
+            exercise = exercises_by_name.get(exercise_name)
+            if exercise is None:
+                log.append(self.style.WARNING(f'  ⚠ Упражнение "{exercise_name}" не найдено'))
+                continue
+            exercises.append(exercise)
         
-        for exercise_name, aliases in self.ALIASES.items():
-            try:
-                exercise = Exercise.objects.get(name=exercise_name, is_active=True)
-                
-                for alias in aliases:
-                    # Проверяем, не существует ли уже такой алиас
-                    if not ExerciseAlias.objects.filter(exercise=exercise, alias=alias).exists():
-                        ExerciseAlias.objects.create(
-                            exercise=exercise,
-                            alias=alias,
-                            match_count=0
-                        )
-                        added_count += 1
-                        self.stdout.write(f'  ✓ Добавлен алиас "{alias}" для "{exercise_name}"')
-                    else:
+        # Проверка и вставка в одной транзакции: один коммит на весь набор
+        with transaction.atomic():
+            # Уже существующие пары (упражнение, алиас) — одним запросом
+            existing_pairs = set(
+                ExerciseAlias.objects.filter(
+                    exercise_id__in=[exercise.id for exercise in exercises]
+                ).values_list('exercise_id', 'alias')
+            )
+            
+            to_create = []
+            skipped_count = 0
+            for exercise in exercises:
+                for alias in ALIASES[exercise.name]:
+                    # bulk_create не вызывает ExerciseAlias.save() — приводим регистр здесь
+                    alias = alias.lower()
+                    if (exercise.id, alias) in existing_pairs:
                         skipped_count += 1
-                        
-            except Exercise.DoesNotExist:
-                self.stdout.write(
-                    self.style.WARNING(f'  ⚠ Упражнение "{exercise_name}" не найдено')
-                )
+                        continue
+                    existing_pairs.add((exercise.id, alias))
+                    to_create.append(ExerciseAlias(exercise=exercise, alias=alias, match_count=0))
+            
+            # unique_together на (exercise, alias) защищает от гонки с параллельной вставкой
+            ExerciseAlias.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+            
+            # bulk_create не отправляет post_save — сбрасываем индекс вариантов вручную,
+            # и только после фиксации транзакции
+            if to_create:
+                transaction.on_commit(invalidate_variant_index)
         
-        self.stdout.write(
-            self.style.SUCCESS(f'\nГотово! Добавлено: {added_count}, Пропущено: {skipped_count}')
-        )
+        log.extend(f'  ✓ Добавлен алиас "{alias.alias}" для "{alias.exercise.name}"' for alias in to_create)
+        log.append(self.style.SUCCESS(f'\nГотово! Добавлено: {len(to_create)}, Пропущено: {skipped_count}'))
+        self.stdout.write('\n'.join(log))
@@ -0,0 +1,43 @@
+"""
+Management команда для удаления забытых файлов фоновых AI-задач
+Запустить: python manage.py purge_ai_uploads (например, раз в час по cron)
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from authentication.tasks import AI_UPLOAD_DIR
+
+
+class Command(BaseCommand):
+    help = 'Удаляет файлы ai_uploads/, которые не забрала ни одна задача'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age',
+            type=int,
+            default=settings.CELERY_RESULT_EXPIRES,
+            help='Возраст файла в секундах, после которого он считается забытым '
+                 '(по умолчанию CELERY_RESULT_EXPIRES)',
+        )
+    
+    def handle(self, *args, **options):
+        # Обычно файл удаляет сама задача; сюда попадают задачи, потерянные брокером
+        # или упавшие вместе с воркером до finally
+        if not default_storage.exists(AI_UPLOAD_DIR):
+            return
+        
+        cutoff = timezone.now() - timedelta(seconds=options['max_age'])
+        _, file_names = default_storage.listdir(AI_UPLOAD_DIR)
+        deleted = 0
+        for file_name in file_names:
+            storage_name = f'{AI_UPLOAD_DIR}/{file_name}'
+            if default_storage.get_modified_time(storage_name) < cutoff:
+                default_storage.delete(storage_name)
+                deleted += 1
+        
+        self.stdout.write(self.style.SUCCESS(f'Удалено файлов: {deleted}'))
@@ -0,0 +1,21 @@
+"""
+Middleware приложения authentication
+"""
+
+
+class ClientIPMiddleware:
+    """
+    Определяет IP клиента один раз на запрос и сохраняет в request.client_ip
+    (первый адрес из X-Forwarded-For, иначе REMOTE_ADDR)
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+        if x_forwarded_for:
+            request.client_ip = x_forwarded_for.split(',', 1)[0].strip()
+        else:
+            request.client_ip = request.META.get('REMOTE_ADDR')
+        return self.get_response(request)
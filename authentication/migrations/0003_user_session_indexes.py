@@ -0,0 +1,38 @@
+# Generated by Django 5.0 on 2026-10-16 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_alter_user_managers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usersession',
+            name='refresh_token',
+            field=models.TextField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-created_at'], name='users_created_30b417_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['provider', 'email_verified'], name='users_provide_ab1a8a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usersession',
+            index=models.Index(fields=['-last_activity'], name='user_sessio_last_ac_0963e2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usersession',
+            index=models.Index(fields=['device_id'], name='user_sessio_device__4ac8e0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usersession',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user', 'is_active'], name='active_sessions_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0 on 2026-10-16 12:30
+
+import authentication.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_user_session_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='id',
+            field=models.UUIDField(default=authentication.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0 on 2026-10-16 13:00
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_token_hashes(apps, schema_editor):
+    UserSession = apps.get_model('authentication', 'UserSession')
+    sessions = list(UserSession.objects.only('id', 'refresh_token'))
+    for session in sessions:
+        session.token_hash = hashlib.sha256(session.refresh_token.encode()).digest()
+    UserSession.objects.bulk_update(sessions, ['token_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0004_alter_user_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usersession',
+            name='refresh_token',
+            field=models.TextField(),
+        ),
+        migrations.AddField(
+            model_name='usersession',
+            name='token_hash',
+            field=models.BinaryField(db_index=True, editable=False, max_length=32, null=True),
+        ),
+        migrations.RunPython(fill_token_hashes, migrations.RunPython.noop),
+    ]
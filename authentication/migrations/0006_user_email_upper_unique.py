@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-16 14:00
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0005_usersession_token_hash'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Upper('email'), name='uniq_user_email_upper'),
+        ),
+    ]
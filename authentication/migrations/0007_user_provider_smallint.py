@@ -0,0 +1,58 @@
+# Generated by Django 5.0 on 2026-10-16 14:00
+
+from django.db import migrations, models
+
+PROVIDER_VALUES = {'email': 0, 'google': 1, 'yandex': 2, 'vk': 3, 'anonymous': 4}
+
+
+def fill_provider_values(apps, schema_editor):
+    User = apps.get_model('authentication', 'User')
+    for code, value in PROVIDER_VALUES.items():
+        User.objects.filter(provider=code).update(provider_new=value)
+    # Неизвестные коды (опечатки, регистр, пустая строка) считаем email — значением
+    # по умолчанию; иначе AlterField в NOT NULL упал бы на середине миграции
+    User.objects.filter(provider_new__isnull=True).update(provider_new=PROVIDER_VALUES['email'])
+
+
+def fill_provider_codes(apps, schema_editor):
+    User = apps.get_model('authentication', 'User')
+    for code, value in PROVIDER_VALUES.items():
+        User.objects.filter(provider_new=value).update(provider=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0006_user_email_upper_unique'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='user',
+            name='users_provide_ab1a8a_idx',
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='provider_new',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.RunPython(fill_provider_values, fill_provider_codes),
+        migrations.RemoveField(
+            model_name='user',
+            name='provider',
+        ),
+        migrations.RenameField(
+            model_name='user',
+            old_name='provider_new',
+            new_name='provider',
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='provider',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Email'), (1, 'Google'), (2, 'Яндекс'), (3, 'VK'), (4, 'Anonymous')], default=0),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['provider', 'email_verified'], name='users_provide_ab1a8a_idx'),
+        ),
+    ]
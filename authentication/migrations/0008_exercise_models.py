@@ -0,0 +1,81 @@
+# Generated by Django 5.0 on 2026-10-16 15:00
+
+import authentication.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0007_user_provider_smallint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Exercise',
+            fields=[
+                ('id', models.UUIDField(default=authentication.models.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(db_index=True, max_length=255)),
+                ('name_ru', models.CharField(blank=True, db_index=True, help_text='Русский перевод названия', max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('category', models.CharField(choices=[('breathing', 'Дыхательные'), ('relaxation', 'Расслабление'), ('meditation', 'Медитация'), ('physical', 'Физические'), ('mindfulness', 'Осознанность'), ('visualization', 'Визуализация'), ('cognitive', 'Когнитивные'), ('other', 'Другое')], default='other', max_length=50)),
+                ('difficulty', models.CharField(choices=[('beginner', 'Начальный'), ('intermediate', 'Средний'), ('advanced', 'Продвинутый')], default='beginner', max_length=20)),
+                ('duration_min', models.IntegerField(blank=True, help_text='Минимальная длительность в секундах', null=True)),
+                ('duration_max', models.IntegerField(blank=True, help_text='Максимальная длительность в секундах', null=True)),
+                ('repetitions', models.IntegerField(blank=True, help_text='Количество повторений', null=True)),
+                ('instructions', models.TextField(blank=True, help_text='Пошаговые инструкции')),
+                ('audio_url', models.URLField(blank=True, help_text='Ссылка на аудио-гайд', null=True)),
+                ('video_url', models.URLField(blank=True, help_text='Ссылка на видео-гайд', null=True)),
+                ('image_url_main', models.URLField(blank=True, help_text='Основное изображение упражнения', null=True)),
+                ('image_url_secondary', models.URLField(blank=True, help_text='Дополнительное изображение', null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('usage_count', models.IntegerField(default=0, help_text='Счётчик использования')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'exercises',
+                'ordering': ['-usage_count', 'name'],
+                'indexes': [models.Index(fields=['category', 'difficulty'], name='exercises_categor_ea4687_idx'), models.Index(fields=['-usage_count'], name='exercises_usage_c_b3b6c1_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserExerciseLog',
+            fields=[
+                ('id', models.UUIDField(default=authentication.models.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('recognized_text', models.TextField(blank=True, help_text='Распознанный текст от пользователя')),
+                ('confidence_score', models.FloatField(blank=True, help_text='Уверенность распознавания (0-1)', null=True)),
+                ('similarity_score', models.FloatField(blank=True, help_text='Оценка схожести (0-1)', null=True)),
+                ('duration_seconds', models.IntegerField(blank=True, null=True)),
+                ('repetitions_done', models.IntegerField(blank=True, null=True)),
+                ('completed', models.BooleanField(default=False)),
+                ('user_rating', models.IntegerField(blank=True, help_text='Оценка 1-5', null=True)),
+                ('user_notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_logs', to='authentication.exercise')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exercise_logs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'user_exercise_logs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='user_exerci_user_id_0c2e08_idx'), models.Index(fields=['exercise', '-created_at'], name='user_exerci_exercis_354985_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ExerciseAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(db_index=True, help_text='Вариант названия или синоним', max_length=255)),
+                ('match_count', models.IntegerField(default=0, help_text='Сколько раз этот алиас был выбран')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='authentication.exercise')),
+            ],
+            options={
+                'db_table': 'exercise_aliases',
+                'ordering': ['-match_count', 'alias'],
+                'unique_together': {('exercise', 'alias')},
+            },
+        ),
+    ]
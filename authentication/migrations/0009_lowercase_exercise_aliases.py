@@ -0,0 +1,44 @@
+# Generated by Django 5.0 on 2026-10-16 15:10
+
+from django.db import migrations
+
+
+def lowercase_aliases(apps, schema_editor):
+    """
+    Алиасы в нижнем регистре (как в ExerciseAlias.save()). Строки, которые после
+    приведения совпали в пределах упражнения, схлопываются в одну: остаётся строка
+    с наибольшим match_count, счётчики дубликатов суммируются
+    """
+    ExerciseAlias = apps.get_model('authentication', 'ExerciseAlias')
+    kept = {}
+    merged = set()
+    duplicate_ids = []
+    for alias in ExerciseAlias.objects.order_by('-match_count', 'id').only('id', 'exercise_id', 'alias', 'match_count'):
+        key = (alias.exercise_id, alias.alias.lower())
+        if key in kept:
+            kept[key].match_count += alias.match_count
+            merged.add(key)
+            duplicate_ids.append(alias.id)
+        else:
+            kept[key] = alias
+    
+    # Сначала удаляем дубликаты, иначе UPDATE упрётся в unique_together (exercise, alias)
+    ExerciseAlias.objects.filter(id__in=duplicate_ids).delete()
+    
+    changed = []
+    for key, alias in kept.items():
+        if alias.alias != key[1] or key in merged:
+            alias.alias = key[1]
+            changed.append(alias)
+    ExerciseAlias.objects.bulk_update(changed, ['alias', 'match_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0008_exercise_models'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_aliases, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0 on 2026-10-16 15:20
+
+from django.db import migrations
+
+# GIN-индексы pg_trgm для search_fields в админке: icontains строится как UPPER(col::text) LIKE UPPER(...).
+# В состояние моделей не входят — SQLite не знает ни gin, ни gin_trgm_ops
+USER_TRIGRAM_INDEXES = [
+    ('users_email_upper_trgm', 'UPPER(email::text)'),
+    ('users_display_name_upper_trgm', 'UPPER(display_name::text)'),
+    ('users_username_upper_trgm', 'UPPER(username::text)'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Расширение и индексы есть только в PostgreSQL; на других БД миграция ничего не делает
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for index_name, expression in USER_TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name} ON users USING gin ({expression} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    # Расширение pg_trgm не удаляем: его могут использовать и другие объекты базы
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name, _ in USER_TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_lowercase_exercise_aliases'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
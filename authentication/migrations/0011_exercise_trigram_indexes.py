@@ -0,0 +1,40 @@
+# Generated by Django 5.0 on 2026-10-16 15:30
+
+from django.db import migrations
+
+# GIN-индексы pg_trgm для поиска упражнений по подстроке и триграммной схожести.
+# В состояние моделей не входят — SQLite не знает ни gin, ни gin_trgm_ops
+EXERCISE_TRIGRAM_INDEXES = [
+    ('exercises_name_trgm', 'exercises', 'name'),
+    ('exercises_name_ru_trgm', 'exercises', 'name_ru'),
+    ('exercise_aliases_alias_trgm', 'exercise_aliases', 'alias'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Индексы есть только в PostgreSQL; на других БД миграция ничего не делает
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name, table, column in EXERCISE_TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name} ON {table} USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name, _, _ in EXERCISE_TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0010_user_trigram_indexes'),
+    ]
+
+    operations = [
+        # Расширение pg_trgm создаётся в 0010
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -1,9 +1,28 @@
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.base_user import BaseUserManager
-from django.db import models
+from django.db import connections, models, router
+from django.db.models.functions import Upper
+from django.utils import timezone
+from django.utils.functional import cached_property
+import hashlib
+import os
+import time
 import uuid
 
 
+def uuid7() -> uuid.UUID:
+    """
+    UUID версии 7 (RFC 9562): 48 бит Unix-времени в миллисекундах + случайные биты.
+    Ключи растут со временем, поэтому вставки идут в конец btree-индекса,
+    а не в случайную страницу, как у uuid4.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80 | int.from_bytes(os.urandom(10), 'big')
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # версия 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # вариант RFC 4122
+    return uuid.UUID(int=value)
+
+
 class UserManager(BaseUserManager):
     use_in_migrations = True
 
@@ -34,17 +53,43 @@ class UserManager(BaseUserManager):
 
         return self._create_user(email, password, username, **extra_fields)
 
+    def upsert_oauth(self, email, defaults):
+        """
+        Вход через OAuth одним запросом:
+        INSERT ... ON CONFLICT (UPPER(email)) DO UPDATE SET last_login_at ... RETURNING
+        Новый пользователь создаётся из defaults, у существующего обновляется только last_login_at.
+        Сигналы save() при этом не отправляются.
+        """
+        db = self._db or router.db_for_write(self.model)
+        connection = connections[db]
+        quote = connection.ops.quote_name
+        
+        user = self.model(email=email, last_login_at=timezone.now(), **defaults)
+        fields = self.model._meta.concrete_fields
+        columns = ', '.join(quote(field.column) for field in fields)
+        params = [field.get_db_prep_save(field.pre_save(user, add=True), connection) for field in fields]
+        
+        sql = (
+            f'INSERT INTO {quote(self.model._meta.db_table)} ({columns}) '
+            f'VALUES ({", ".join(["%s"] * len(fields))}) '
+            f'ON CONFLICT ((UPPER({quote("email")}))) '
+            f'DO UPDATE SET {quote("last_login_at")} = EXCLUDED.{quote("last_login_at")} '
+            f'RETURNING {columns}'
+        )
+        return next(iter(self.raw(sql, params, using=db)))
+
 
 class User(AbstractUser):
     """Кастомная модель пользователя с поддержкой OAuth провайдеров"""
     
-    PROVIDER_CHOICES = [
-        ('email', 'Email'),
-        ('google', 'Google'),
-        ('yandex', 'Яндекс'),
-        ('vk', 'VK'),
-        ('anonymous', 'Anonymous'),
-    ]
+    class Provider(models.IntegerChoices):
+        # smallint вместо VARCHAR: узкая колонка и ключ индекса (provider, email_verified).
+        # В API провайдер по-прежнему отдаётся строкой: name.lower()
+        EMAIL = 0, 'Email'
+        GOOGLE = 1, 'Google'
+        YANDEX = 2, 'Яндекс'
+        VK = 3, 'VK'
+        ANONYMOUS = 4, 'Anonymous'
     
     GENDER_CHOICES = [
         ('male', 'Мужской'),
@@ -53,11 +98,11 @@ class User(AbstractUser):
         ('prefer_not_to_say', 'Предпочитаю не указывать'),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     email = models.EmailField(unique=True)
     display_name = models.CharField(max_length=255)
     photo_url = models.URLField(blank=True, null=True)
-    provider = models.CharField(max_length=20, choices=PROVIDER_CHOICES, default='email')
+    provider = models.PositiveSmallIntegerField(choices=Provider.choices, default=Provider.EMAIL)
     provider_id = models.CharField(max_length=255, blank=True, null=True)
     phone_number = models.CharField(max_length=20, blank=True, null=True)
     email_verified = models.BooleanField(default=False)
@@ -86,37 +131,66 @@ class User(AbstractUser):
     class Meta:
         db_table = 'users'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['provider', 'email_verified']),
+        ]
+        constraints = [
+            # Email уникален без учёта регистра на любой БД. Индекс обслуживает email__iexact
+            # только на PostgreSQL (рабочая БД): там iexact компилируется в UPPER(email) = UPPER(%s).
+            # На SQLite iexact — это LIKE ... ESCAPE, и индекс по UPPER(email) не используется
+            models.UniqueConstraint(Upper('email'), name='uniq_user_email_upper'),
+        ]
     
     def __str__(self):
         return self.email
+    
+    def save(self, *args, **kwargs):
+        # Сбрасываем кэш metadata: поля профиля могли измениться
+        self.__dict__.pop('metadata', None)
+        super().save(*args, **kwargs)
+    
+    @cached_property
+    def metadata(self):
+        """Метаданные и настройки пользователя (собираются один раз на экземпляр)"""
+        return {
+            'age': self.age,
+            'gender': self.gender,
+            'country': self.country,
+            'language': self.language,
+            'timezone': self.timezone,
+            'preferences': {
+                'notifications': self.notifications_enabled,
+                'biometric': self.biometric_enabled,
+                'theme': self.theme,
+            }
+        }
 
 
 class Exercise(models.Model):
     """Модель упражнения в базе"""
     
-    CATEGORY_CHOICES = [
-        ('breathing', 'Дыхательные'),
-        ('relaxation', 'Расслабление'),
-        ('meditation', 'Медитация'),
-        ('physical', 'Физические'),
-        ('mindfulness', 'Осознанность'),
-        ('visualization', 'Визуализация'),
-        ('cognitive', 'Когнитивные'),
-        ('other', 'Другое'),
-    ]
+    class Category(models.TextChoices):
+        BREATHING = 'breathing', 'Дыхательные'
+        RELAXATION = 'relaxation', 'Расслабление'
+        MEDITATION = 'meditation', 'Медитация'
+        PHYSICAL = 'physical', 'Физические'
+        MINDFULNESS = 'mindfulness', 'Осознанность'
+        VISUALIZATION = 'visualization', 'Визуализация'
+        COGNITIVE = 'cognitive', 'Когнитивные'
+        OTHER = 'other', 'Другое'
     
-    DIFFICULTY_CHOICES = [
-        ('beginner', 'Начальный'),
-        ('intermediate', 'Средний'),
-        ('advanced', 'Продвинутый'),
-    ]
+    class Difficulty(models.TextChoices):
+        BEGINNER = 'beginner', 'Начальный'
+        INTERMEDIATE = 'intermediate', 'Средний'
+        ADVANCED = 'advanced', 'Продвинутый'
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     name = models.CharField(max_length=255, db_index=True)  # Основное название (английское)
     name_ru = models.CharField(max_length=255, blank=True, db_index=True, help_text='Русский перевод названия')
     description = models.TextField(blank=True)
-    category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, default='other')
-    difficulty = models.CharField(max_length=20, choices=DIFFICULTY_CHOICES, default='beginner')
+    category = models.CharField(max_length=50, choices=Category.choices, default=Category.OTHER)
+    difficulty = models.CharField(max_length=20, choices=Difficulty.choices, default=Difficulty.BEGINNER)
     
     # Параметры упражнения
     duration_min = models.IntegerField(null=True, blank=True, help_text='Минимальная длительность в секундах')
@@ -162,11 +236,16 @@ class ExerciseAlias(models.Model):
     
     class Meta:
         db_table = 'exercise_aliases'
+        # Уникальность (exercise, alias) — составной индекс для exercise.aliases.filter(alias=...);
+        # поиск по одному alias обслуживает db_index на поле
         unique_together = [['exercise', 'alias']]
         ordering = ['-match_count', 'alias']
-        indexes = [
-            models.Index(fields=['alias']),
-        ]
+    
+    def save(self, *args, **kwargs):
+        # Алиасы храним в нижнем регистре: поиск идёт точным сравнением
+        # по обычному btree-индексу, без UPPER()/LOWER() в запросе
+        self.alias = self.alias.lower()
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.alias} → {self.exercise.name}"
@@ -175,7 +254,10 @@ class ExerciseAlias(models.Model):
 class UserExerciseLog(models.Model):
     """Лог использования упражнений пользователем"""
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    # CASCADE здесь удаляет логи одним DELETE ... WHERE user_id IN (...) без выборки строк
+    # (fast delete в Collector), пока на UserExerciseLog нет сигналов pre/post_delete
+    # и зависимых моделей — не добавляйте их без необходимости
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='exercise_logs')
     exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE, related_name='user_logs')
     
@@ -216,6 +298,8 @@ class UserSession(models.Model):
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
     refresh_token = models.TextField()
+    # SHA-256 от refresh_token: поиск сессии идёт по фиксированным 32 байтам, а не по JWT
+    token_hash = models.BinaryField(max_length=32, null=True, editable=False, db_index=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     last_activity = models.DateTimeField(auto_now=True)
@@ -223,6 +307,24 @@ class UserSession(models.Model):
     class Meta:
         db_table = 'user_sessions'
         ordering = ['-last_activity']
+        indexes = [
+            models.Index(fields=['-last_activity']),
+            models.Index(fields=['device_id']),
+            # Частичный индекс: запросы почти всегда идут по активным сессиям пользователя
+            models.Index(fields=['user', 'is_active'], condition=models.Q(is_active=True), name='active_sessions_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        self.token_hash = self.hash_token(self.refresh_token)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'refresh_token' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'token_hash'}
+        super().save(*args, **kwargs)
+    
+    @staticmethod
+    def hash_token(raw_token: str) -> bytes:
+        """Хэш токена для поиска: UserSession.objects.filter(token_hash=UserSession.hash_token(raw))"""
+        return hashlib.sha256(raw_token.encode()).digest()
     
     def __str__(self):
         return f"{self.user.email} - {self.device_type}"
@@ -1,14 +1,45 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.db.models import Prefetch
+from django.utils import timezone
 from .models import UserSession, Exercise, ExerciseAlias, UserExerciseLog
 
 User = get_user_model()
 
+# Подписи choices: один dict-lookup вместо обхода flatchoices в get_FOO_display()
+CATEGORY_LABELS = dict(Exercise.Category.choices)
+DIFFICULTY_LABELS = dict(Exercise.Difficulty.choices)
+# Провайдер хранится числом, клиенту отдаём прежний строковый код ('email', 'google', ...)
+PROVIDER_CODES = {provider.value: provider.name.lower() for provider in User.Provider}
+
+
+def validate_unique_email(value, instance=None):
+    """
+    Email уникален без учёта регистра (uniq_user_email_upper): проверяем заранее,
+    чтобы дубликат давал 400, а не IntegrityError из БД
+    """
+    users = User.objects.filter(email__iexact=value)
+    if instance is not None:
+        users = users.exclude(pk=instance.pk)
+    if users.exists():
+        raise serializers.ValidationError('Пользователь с таким email уже существует')
+    return value
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Сериализатор для пользователя с метаданными"""
-    metadata = serializers.SerializerMethodField()
+    metadata = serializers.DictField(read_only=True)
+    provider = serializers.SerializerMethodField()
+    
+    # Колонки, которые читает сериализатор (включая источники User.metadata):
+    # для выборок под ответ — User.objects.only(*UserSerializer.MODEL_FIELDS)
+    MODEL_FIELDS = (
+        'id', 'email', 'display_name', 'photo_url', 'provider',
+        'phone_number', 'email_verified', 'created_at', 'last_login_at',
+        'age', 'gender', 'country', 'language', 'timezone',
+        'notifications_enabled', 'biometric_enabled', 'theme',
+    )
     
     class Meta:
         model = User
@@ -18,20 +49,14 @@ class UserSerializer(serializers.ModelSerializer):
             'metadata'
         ]
         read_only_fields = ['id', 'created_at', 'email_verified', 'provider']
+        # Регистрозависимый UniqueValidator заменён проверкой в validate_email
+        extra_kwargs = {'email': {'validators': []}}
     
-    def get_metadata(self, obj):
-        return {
-            'age': obj.age,
-            'gender': obj.gender,
-            'country': obj.country,
-            'language': obj.language,
-            'timezone': obj.timezone,
-            'preferences': {
-                'notifications': obj.notifications_enabled,
-                'biometric': obj.biometric_enabled,
-                'theme': obj.theme,
-            }
-        }
+    def get_provider(self, obj):
+        return PROVIDER_CODES.get(obj.provider)
+    
+    def validate_email(self, value):
+        return validate_unique_email(value, self.instance)
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -43,17 +68,38 @@ class RegisterSerializer(serializers.ModelSerializer):
         style={'input_type': 'password'}
     )
     
+    # camelCase от клиента -> snake_case полей сериализатора
+    CAMEL_CASE_FIELDS = {'displayName': 'display_name', 'photoUrl': 'photo_url'}
+    
     class Meta:
         model = User
         fields = ['email', 'password', 'display_name']
+        extra_kwargs = {'email': {'validators': []}}
+    
+    def validate_email(self, value):
+        return validate_unique_email(value)
+    
+    def to_internal_value(self, data):
+        renamed = {
+            snake: data[camel]
+            for camel, snake in self.CAMEL_CASE_FIELDS.items()
+            if camel in data and snake not in data
+        }
+        if renamed:
+            # Копируем данные только если клиент прислал camelCase;
+            # {**data} — плоский dict и для JSON, и для QueryDict, без клонирования MultiValueDict
+            data = {**data, **renamed}
+        return super().to_internal_value(data)
     
     def create(self, validated_data):
+        # Регистрация сразу выдаёт токены — время входа пишем тем же INSERT
         user = User.objects.create_user(
             email=validated_data['email'],
             username=validated_data['email'],
             display_name=validated_data['display_name'],
             password=validated_data['password'],
-            provider='email'
+            provider=User.Provider.EMAIL,
+            last_login_at=timezone.now()
         )
         return user
 
@@ -66,7 +112,8 @@ class LoginSerializer(serializers.Serializer):
 
 class OAuthSerializer(serializers.Serializer):
     """Сериализатор для OAuth аутентификации"""
-    provider = serializers.ChoiceField(choices=['google', 'yandex', 'vk'])
+    # Провайдер задаётся URL; в теле необязателен, но если передан — должен совпадать
+    provider = serializers.ChoiceField(choices=['google', 'yandex', 'vk'], required=False)
     id_token = serializers.CharField(required=False)
     access_token = serializers.CharField(required=False)
     user = serializers.DictField(required=False)
@@ -117,8 +164,8 @@ class ExerciseAliasSerializer(serializers.ModelSerializer):
 
 class ExerciseSerializer(serializers.ModelSerializer):
     """Сериализатор для упражнений"""
-    category_display = serializers.CharField(source='get_category_display', read_only=True)
-    difficulty_display = serializers.CharField(source='get_difficulty_display', read_only=True)
+    category_display = serializers.SerializerMethodField()
+    difficulty_display = serializers.SerializerMethodField()
     aliases = ExerciseAliasSerializer(many=True, read_only=True)
     
     class Meta:
@@ -131,6 +178,22 @@ class ExerciseSerializer(serializers.ModelSerializer):
             'usage_count', 'aliases', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'usage_count', 'created_at', 'updated_at']
+    
+    def get_category_display(self, obj):
+        return CATEGORY_LABELS.get(obj.category, obj.category)
+    
+    def get_difficulty_display(self, obj):
+        return DIFFICULTY_LABELS.get(obj.difficulty, obj.difficulty)
+    
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """
+        Подгружает алиасы одним запросом на весь queryset (без N+1).
+        Любой queryset, который сериализуется этим классом, должен проходить через этот метод.
+        """
+        return queryset.prefetch_related(
+            Prefetch('aliases', queryset=ExerciseAlias.objects.only('id', 'exercise_id', 'alias', 'match_count'))
+        )
 
 
 class ExerciseMatchSerializer(serializers.Serializer):
@@ -161,7 +224,7 @@ class ExerciseMatchRequestSerializer(serializers.Serializer):
     """Сериализатор для запроса на поиск упражнений"""
     recognized_text = serializers.CharField(required=True, help_text='Распознанный текст')
     category = serializers.ChoiceField(
-        choices=Exercise.CATEGORY_CHOICES,
+        choices=Exercise.Category.choices,
         required=False,
         allow_null=True,
         help_text='Фильтр по категории'
@@ -188,6 +251,19 @@ class UserExerciseLogSerializer(serializers.ModelSerializer):
             'user_rating', 'user_notes', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
+    
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """
+        Подтягивает упражнение тем же запросом (JOIN), без отдельного SELECT на каждую запись.
+        Из упражнения читаются только колонки, которые отдаёт сериализатор.
+        """
+        return queryset.select_related('exercise').only(
+            'id', 'exercise', 'recognized_text', 'confidence_score', 'similarity_score',
+            'duration_seconds', 'repetitions_done', 'completed',
+            'user_rating', 'user_notes', 'created_at',
+            'exercise__name', 'exercise__category',
+        )
 
 
 class ExerciseConfirmSerializer(serializers.Serializer):
@@ -0,0 +1,31 @@
+"""
+Сигналы приложения:
+- сброс кэша нормализованных вариантов упражнений
+- сброс кэша пользователя для JWT-аутентификации
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import User, Exercise, ExerciseAlias
+from .authentication import invalidate_cached_user
+from .exercise_matcher import invalidate_variant_index
+
+# Поля-счётчики, которые не влияют на варианты названий
+COUNTER_FIELDS = frozenset({'usage_count', 'match_count'})
+
+
+@receiver([post_save, post_delete], sender=Exercise)
+@receiver([post_save, post_delete], sender=ExerciseAlias)
+def invalidate_exercise_variants(sender, update_fields=None, **kwargs):
+    """Сбрасывает индекс вариантов при изменении упражнений или алиасов"""
+    if update_fields and update_fields <= COUNTER_FIELDS:
+        return
+    invalidate_variant_index()
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """Сбрасывает закэшированного пользователя при любом изменении"""
+    invalidate_cached_user(instance.pk)
+
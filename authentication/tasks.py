@@ -0,0 +1,71 @@
+"""
+Фоновые задачи Celery приложения authentication
+"""
+
+from celery import shared_task
+from django.core.files.storage import default_storage
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .exercise_parser import ExerciseParser
+from .yandex_services import YandexSpeechKit, YandexVision, YandexGPT
+
+# Каталог default_storage для файлов фоновых AI-задач (?async=1)
+AI_UPLOAD_DIR = 'ai_uploads'
+
+
+@shared_task(ignore_result=True)
+def blacklist_refresh_token(refresh_token: str) -> None:
+    """Заносит refresh-токен в чёрный список (запись в OutstandingToken/BlacklistedToken)"""
+    try:
+        token = RefreshToken(refresh_token)
+    except TokenError:
+        # Повторный выход: токен уже в чёрном списке (или успел истечь) — делать нечего
+        return
+    token.blacklist()
+
+
+def recognize_workout_speech(audio_file) -> dict:
+    """Распознаёт речь и разбирает подходы: {'text': ..., 'parsed': ...}"""
+    text = YandexSpeechKit.recognize_audio(audio_file)
+    
+    # Парсим структурированные данные
+    parsed_data = ExerciseParser.parse(text)
+    
+    # Добавляем краткое описание подходов
+    if parsed_data.get('sets'):
+        parsed_data['sets_summary'] = ExerciseParser.format_sets_summary(parsed_data['sets'])
+    
+    return {'text': text, 'parsed': parsed_data}
+
+
+@shared_task(ignore_result=False)
+def speech_to_text_task(storage_name: str) -> dict:
+    """Распознавание загруженного аудио (POST /speech-to-text/?async=1); файл удаляется после обработки"""
+    try:
+        with default_storage.open(storage_name, 'rb') as audio_file:
+            return recognize_workout_speech(audio_file)
+    finally:
+        default_storage.delete(storage_name)
+
+
+@shared_task(ignore_result=False)
+def analyze_image_task(storage_name: str) -> str:
+    """Распознавание текста на загруженном изображении (POST /analyze-image/?async=1)"""
+    try:
+        with default_storage.open(storage_name, 'rb') as image_file:
+            return YandexVision.analyze_workout_image(image_file)
+    finally:
+        default_storage.delete(storage_name)
+
+
+@shared_task(ignore_result=False)
+def parse_workout_task(text: str) -> dict:
+    """Парсинг текста тренировки через YandexGPT (POST /parse-workout/?async=1)"""
+    return YandexGPT.parse_workout_from_text(text)
+
+
+@shared_task(ignore_result=False)
+def workout_recommendations_task(user_history):
+    """AI рекомендации по истории тренировок (POST /ai-recommendations/?async=1)"""
+    return YandexGPT.generate_workout_recommendations(user_history)
@@ -1,3 +1,395 @@
-from django.test import TestCase
+"""
+Тесты приложения authentication
+Запуск: python manage.py test authentication
+"""
 
-# Create your tests here.
+import base64
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from kombu.exceptions import OperationalError as BrokerOperationalError
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from . import exercise_matcher
+from .authentication import USER_CACHE_KEY
+from .exercise_matcher import (
+    QuickExerciseMatcher, get_match_cache_version, get_variant_index, invalidate_variant_index,
+)
+from .models import Exercise, ExerciseAlias, User
+from .tasks import AI_UPLOAD_DIR, speech_to_text_task
+from .views import _enqueue_upload_task, get_tokens_for_user
+from .yandex_services import YandexVision
+
+
+@override_settings(YANDEX_GPT_FOLDER_ID='b1g"folder')
+class VisionRequestBodyTests(SimpleTestCase):
+    """Потоковое тело batchAnalyze должно быть валидным JSON с исходными байтами в content"""
+
+    FEATURES = [{'type': 'TEXT_DETECTION', 'textDetectionConfig': {'languageCodes': ['ru', 'en']}}]
+
+    def build(self, content, chunk_size):
+        with mock.patch.object(YandexVision, 'CHUNK_SIZE', chunk_size):
+            return b''.join(YandexVision.request_body(ContentFile(content), self.FEATURES))
+
+    def test_round_trip(self):
+        content = os.urandom(10_000)
+        # 7 и 1000 не кратны 3: куски base64 склеиваются только после добора до 3 байт
+        for chunk_size in (1, 7, 1000, 3 * 16 * 1024):
+            with self.subTest(chunk_size=chunk_size):
+                body = json.loads(self.build(content, chunk_size))
+                self.assertEqual(body['folderId'], 'b1g"folder')
+                self.assertEqual(body['analyze_specs'][0]['features'], self.FEATURES)
+                self.assertEqual(base64.b64decode(body['analyze_specs'][0]['content'], validate=True), content)
+
+    def test_empty_file(self):
+        body = json.loads(self.build(b'', 7))
+        self.assertEqual(body['analyze_specs'][0]['content'], '')
+
+
+class AIUploadCleanupTests(SimpleTestCase):
+    """Файлы ?async=1 не должны оставаться в default_storage ни при каком исходе"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def uploads(self):
+        if not default_storage.exists(AI_UPLOAD_DIR):
+            return []
+        return default_storage.listdir(AI_UPLOAD_DIR)[1]
+
+    def test_file_removed_when_enqueue_fails(self):
+        request = mock.Mock(user=mock.Mock(pk='user-1'))
+        task = mock.Mock()
+        task.apply_async.side_effect = BrokerOperationalError('broker down')
+        with self.assertRaises(BrokerOperationalError):
+            _enqueue_upload_task(request, task, ContentFile(b'audio', name='voice.m4a'))
+        self.assertEqual(self.uploads(), [])
+
+    def test_file_removed_when_task_fails(self):
+        storage_name = default_storage.save(f'{AI_UPLOAD_DIR}/upload', ContentFile(b'audio'))
+        with mock.patch('authentication.tasks.recognize_workout_speech', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                speech_to_text_task(storage_name)
+        self.assertFalse(default_storage.exists(storage_name))
+
+    def test_purge_removes_only_stale_files(self):
+        stale = default_storage.save(f'{AI_UPLOAD_DIR}/stale', ContentFile(b'audio'))
+        fresh = default_storage.save(f'{AI_UPLOAD_DIR}/fresh', ContentFile(b'audio'))
+        two_hours_ago = time.time() - 7200
+        os.utime(default_storage.path(stale), (two_hours_ago, two_hours_ago))
+
+        call_command('purge_ai_uploads', max_age=3600, stdout=mock.Mock())
+
+        self.assertFalse(default_storage.exists(stale))
+        self.assertTrue(default_storage.exists(fresh))
+
+
+class ExerciseMatcherCacheTests(TestCase):
+    """Индексы вариантов и версия поиска: сброс сигналами и конечное время жизни"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_variant_index_is_cached_until_invalidated(self):
+        build = mock.Mock(return_value={'id': ['variant']})
+        get_variant_index('match', build)
+        get_variant_index('match', build)
+        self.assertEqual(build.call_count, 1)
+
+        invalidate_variant_index()
+        get_variant_index('match', build)
+        self.assertEqual(build.call_count, 2)
+
+    @override_settings(EXERCISE_INDEX_CACHE_TIMEOUT=0)
+    def test_variant_index_expires(self):
+        build = mock.Mock(return_value={})
+        get_variant_index('match', build)
+        get_variant_index('match', build)
+        self.assertEqual(build.call_count, 2)
+
+    def test_exercise_and_alias_changes_bump_version(self):
+        version = get_match_cache_version()
+        self.assertEqual(get_match_cache_version(), version)
+
+        exercise = Exercise.objects.create(name='Box breathing')
+        self.assertNotEqual(get_match_cache_version(), version)
+
+        version = get_match_cache_version()
+        ExerciseAlias.objects.create(exercise=exercise, alias='Дыхание квадратом')
+        self.assertNotEqual(get_match_cache_version(), version)
+
+        # Счётчики на варианты не влияют — версия не меняется
+        version = get_match_cache_version()
+        exercise.usage_count += 1
+        exercise.save(update_fields=['usage_count'])
+        self.assertEqual(get_match_cache_version(), version)
+
+    def test_alias_is_stored_lowercased(self):
+        exercise = Exercise.objects.create(name='Box breathing')
+        alias = ExerciseAlias.objects.create(exercise=exercise, alias='Дыхание Квадратом')
+        self.assertEqual(alias.alias, 'дыхание квадратом')
+
+    def test_process_lru_is_bypassed_without_shared_cache(self):
+        with mock.patch.object(exercise_matcher, '_cached_quick_matches') as cached:
+            QuickExerciseMatcher.find_matches('дыхание')
+        cached.assert_not_called()
+
+    def test_process_lru_is_used_with_shared_cache(self):
+        with mock.patch.object(exercise_matcher, 'is_shared_cache', return_value=True), \
+                mock.patch.object(exercise_matcher, '_cached_quick_matches', return_value=()) as cached:
+            QuickExerciseMatcher.find_matches(' Дыхание ')
+        cached.assert_called_once_with(get_match_cache_version(), 'дыхание', 'ru', 3)
+
+
+class OAuthUpsertTests(TestCase):
+    """User.objects.upsert_oauth: создание, обновление last_login_at, email без учёта регистра"""
+
+    DEFAULTS = {
+        'username': 'oauth_user',
+        'display_name': 'OAuth User',
+        'provider': User.Provider.GOOGLE,
+        'email_verified': True,
+    }
+
+    def test_creates_new_user(self):
+        user = User.objects.upsert_oauth('new@example.com', defaults=self.DEFAULTS)
+        self.assertEqual(user.email, 'new@example.com')
+        self.assertEqual(user.provider, User.Provider.GOOGLE)
+        self.assertIsNotNone(user.last_login_at)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_existing_user_only_gets_last_login(self):
+        existing = User.objects.create_user(
+            email='old@example.com', password='x', display_name='Old Name', provider=User.Provider.EMAIL
+        )
+        user = User.objects.upsert_oauth('old@example.com', defaults=self.DEFAULTS)
+        existing.refresh_from_db()
+        self.assertEqual(user.pk, existing.pk)
+        self.assertEqual(existing.display_name, 'Old Name')
+        self.assertEqual(existing.provider, User.Provider.EMAIL)
+        self.assertIsNotNone(existing.last_login_at)
+
+    def test_case_variant_email_matches_existing_user(self):
+        existing = User.objects.create_user(email='Case@Example.com', password='x', display_name='Case')
+        user = User.objects.upsert_oauth('case@example.COM', defaults=self.DEFAULTS)
+        self.assertEqual(user.pk, existing.pk)
+        self.assertEqual(User.objects.count(), 1)
+
+
+class OAuthProviderTests(TestCase):
+    """Провайдер задаётся URL; противоречащий ему provider в теле отклоняется"""
+
+    def test_body_provider_must_match_url(self):
+        response = APIClient().post(
+            '/api/auth/oauth/google/', {'provider': 'vk', 'id_token': 'token'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('provider', response.json())
+        self.assertFalse(User.objects.exists())
+
+
+class UserCacheTests(TestCase):
+    """Кэш аутентификации и кэш профиля: без хэша пароля и без устаревших данных"""
+
+    def setUp(self):
+        cache.clear()
+        self.password = 'Str0ng-passw0rd!'
+        self.user = User.objects.create_user(
+            email='cache@example.com', password=self.password, display_name='Cached'
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(self.user)['accessToken']}")
+
+    def test_auth_cache_holds_no_password_hash(self):
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 200)
+        values = cache.get(USER_CACHE_KEY.format(self.user.pk))
+        self.assertIsNotNone(values)
+        self.assertNotIn(self.user.password, values)
+
+    def test_cached_user_can_change_password(self):
+        # Второй запрос берёт пользователя из кэша: пароль догружается из БД
+        self.client.get('/api/auth/me/')
+        response = self.client.post('/api/auth/change-password/', {
+            'old_password': self.password,
+            'new_password': 'An0ther-passw0rd!',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('An0ther-passw0rd!'))
+
+    def test_profile_update_keeps_password(self):
+        self.client.get('/api/auth/me/')
+        response = self.client.patch('/api/auth/me/', {'display_name': 'Renamed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.display_name, 'Renamed')
+        self.assertTrue(self.user.check_password(self.password))
+
+    def test_profile_is_refreshed_after_save(self):
+        self.assertEqual(self.client.get('/api/auth/me/').json()['display_name'], 'Cached')
+        self.user.display_name = 'Saved'
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/me/').json()['display_name'], 'Saved')
+
+    def test_login_refreshes_last_login_in_profile(self):
+        self.client.get('/api/auth/me/')
+        response = APIClient().post('/api/auth/login/', {
+            'email': 'cache@example.com', 'password': self.password,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        last_login_at = response.json()['user']['last_login_at']
+        self.assertIsNotNone(last_login_at)
+        self.assertEqual(self.client.get('/api/auth/me/').json()['last_login_at'], last_login_at)
+
+
+class EmailUniquenessTests(TestCase):
+    """Email уникален без учёта регистра: дубликат отклоняется с 400"""
+
+    def setUp(self):
+        User.objects.create_user(email='cache@example.com', password='x', display_name='Existing')
+
+    def test_case_variant_email_is_rejected(self):
+        response = APIClient().post('/api/auth/register/', {
+            'email': 'CACHE@example.com', 'password': 'An0ther-passw0rd!', 'display_name': 'Dup',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json())
+
+
+class LogoutTests(TestCase):
+    """В чёрный список попадает только refresh-токен, в том числе при недоступном брокере"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='logout@example.com', password='x', display_name='Logout')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(self.user)['accessToken']}")
+
+    def test_logout_blacklists_inline_when_broker_is_down(self):
+        refresh = get_tokens_for_user(self.user)['refreshToken']
+        with mock.patch('authentication.views.blacklist_refresh_token.delay',
+                        side_effect=BrokerOperationalError('broker down')):
+            response = self.client.post('/api/auth/logout/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(BlacklistedToken.objects.filter(token__token=refresh).exists())
+
+    def test_logout_rejects_access_token(self):
+        access = get_tokens_for_user(self.user)['accessToken']
+        response = self.client.post('/api/auth/logout/', {'refresh': access}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class AppConfigCachingTests(TestCase):
+    """Публичный конфиг отдаётся с Cache-Control и ETag, повторный запрос — 304"""
+
+    def test_cache_headers_and_conditional_get(self):
+        response = self.client.get('/api/config/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age=300', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+        self.assertTrue(response.has_header('ETag'))
+
+        response = self.client.get('/api/config/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=False)
+class AsyncAITaskTests(TestCase):
+    """?async=1 отвечает 202, статус задачи видит только её владелец"""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(email='owner@example.com', password='x', display_name='Owner')
+        self.other = User.objects.create_user(email='other@example.com', password='x', display_name='Other')
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def enqueue(self):
+        with mock.patch('authentication.views.parse_workout_task.apply_async') as apply_async:
+            response = self.client_for(self.owner).post(
+                '/api/auth/parse-workout/?async=1', {'text': 'жим лёжа 80кг 10 раз'}, format='json'
+            )
+        self.assertEqual(response.status_code, 202)
+        task_id = response.json()['task_id']
+        apply_async.assert_called_once_with(('жим лёжа 80кг 10 раз',), task_id=task_id)
+        return task_id
+
+    def test_owner_polls_result(self):
+        task_id = self.enqueue()
+        result = mock.Mock(successful=mock.Mock(return_value=True), result={'exercises': []})
+        with mock.patch('authentication.views.AsyncResult', return_value=result):
+            response = self.client_for(self.owner).get(f'/api/auth/tasks/{task_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'task_id': task_id, 'status': 'success', 'result': {'exercises': []}})
+
+    def test_pending_task(self):
+        task_id = self.enqueue()
+        result = mock.Mock(
+            successful=mock.Mock(return_value=False), failed=mock.Mock(return_value=False), state='PENDING'
+        )
+        with mock.patch('authentication.views.AsyncResult', return_value=result):
+            response = self.client_for(self.owner).get(f'/api/auth/tasks/{task_id}/')
+        self.assertEqual(response.json()['status'], 'pending')
+
+    def test_other_user_gets_404(self):
+        task_id = self.enqueue()
+        with mock.patch('authentication.views.AsyncResult') as async_result:
+            response = self.client_for(self.other).get(f'/api/auth/tasks/{task_id}/')
+        self.assertEqual(response.status_code, 404)
+        async_result.assert_not_called()
+
+
+class MigrationTests(TransactionTestCase):
+    """Миграции данных: заполнение новых полей по существующим строкам"""
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([('authentication', target)])
+        return executor.loader.project_state([('authentication', target)]).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_0005_fills_token_hashes(self):
+        apps = self.migrate('0004_alter_user_id')
+        OldUser = apps.get_model('authentication', 'User')
+        OldSession = apps.get_model('authentication', 'UserSession')
+        user = OldUser.objects.create(username='u', email='u@example.com', display_name='U')
+        OldSession.objects.create(user=user, device_id='d', device_type='ios', refresh_token='raw-token')
+
+        apps = self.migrate('0005_usersession_token_hash')
+        session = apps.get_model('authentication', 'UserSession').objects.get()
+        self.assertEqual(bytes(session.token_hash), hashlib.sha256(b'raw-token').digest())
+
+    def test_0007_maps_provider_codes(self):
+        apps = self.migrate('0006_user_email_upper_unique')
+        OldUser = apps.get_model('authentication', 'User')
+        for username, provider in [('g', 'google'), ('v', 'vk'), ('e', 'email'), ('x', 'Google '), ('n', '')]:
+            OldUser.objects.create(
+                username=username, email=f'{username}@example.com', display_name=username, provider=provider
+            )
+
+        apps = self.migrate('0007_user_provider_smallint')
+        providers = dict(apps.get_model('authentication', 'User').objects.values_list('username', 'provider'))
+        self.assertEqual(providers, {'g': 1, 'v': 3, 'e': 0, 'x': 0, 'n': 0})
@@ -0,0 +1,13 @@
+"""
+Ограничение частоты запросов приложения authentication
+"""
+
+from rest_framework.throttling import UserRateThrottle
+
+
+class AIRateThrottle(UserRateThrottle):
+    """
+    Лимит на эндпоинты Yandex AI (SpeechKit, Vision, GPT): каждый вызов — платный внешний запрос.
+    Частота — REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['ai'], счётчики в кэше Django
+    """
+    scope = 'ai'
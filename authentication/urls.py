@@ -10,9 +10,10 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     
     # OAuth Authentication
-    path('google/', views.google_login_view, name='google_login'),
-    path('yandex/', views.yandex_login_view, name='yandex_login'),
-    path('vk/', views.vk_login_view, name='vk_login'),
+    path('oauth/<str:provider>/', views.oauth_login_view, name='oauth_login'),
+    path('google/', views.oauth_login_view, {'provider': 'google'}, name='google_login'),
+    path('yandex/', views.oauth_login_view, {'provider': 'yandex'}, name='yandex_login'),
+    path('vk/', views.oauth_login_view, {'provider': 'vk'}, name='vk_login'),
     
     # User Management
     path('logout/', views.logout_view, name='logout'),
@@ -28,13 +29,15 @@ urlpatterns = [
     path('analyze-image/', views.analyze_image_view, name='analyze_image'),
     path('parse-workout/', views.parse_workout_text_view, name='parse_workout'),
     path('ai-recommendations/', views.ai_recommendations_view, name='ai_recommendations'),
+    path('tasks/<uuid:task_id>/', views.ai_task_status_view, name='ai_task_status'),
     
     # Exercise Matching and Management
     path('exercises/match/', views.match_exercise_view, name='match_exercise'),
     path('exercises/quick-match/', views.quick_match_exercise_view, name='quick_match_exercise'),
     path('exercises/confirm/', views.confirm_exercise_view, name='confirm_exercise'),
-    path('exercises/', views.list_exercises_view, name='list_exercises'),
-    path('exercises/<uuid:exercise_id>/', views.exercise_detail_view, name='exercise_detail'),
     path('exercises/history/', views.user_exercise_history_view, name='exercise_history'),
     path('exercises/categories/', views.exercise_categories_view, name='exercise_categories'),
+    path('exercises/', views.list_exercises_view, name='list_exercises'),
+    # Маршрут с конвертером — последним, после всех статических exercises/*
+    path('exercises/<uuid:exercise_id>/', views.exercise_detail_view, name='exercise_detail'),
 ]
@@ -1,14 +1,37 @@
 from rest_framework import status, generics, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import (
+    api_view, permission_classes, authentication_classes, renderer_classes, parser_classes,
+    throttle_classes,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken, UntypedToken
 from django.contrib.auth import authenticate, get_user_model
 from django.conf import settings
-from datetime import datetime
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, F, Window
+from django.http import HttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag
+from django.utils import timezone
 import requests as http_requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import hashlib
 import json
+import logging
+import time
+import uuid
+from celery.result import AsyncResult
+from kombu.exceptions import OperationalError as BrokerOperationalError
+from functools import lru_cache
 
 from .serializers import (
     RegisterSerializer, 
@@ -24,10 +47,31 @@ from .serializers import (
     ExerciseConfirmSerializer,
 )
 from .models import UserSession, Exercise, ExerciseAlias, UserExerciseLog
-from .yandex_services import YandexSpeechKit, YandexVision, YandexGPT
-from .exercise_matcher import ExerciseMatcher
+from .yandex_services import YandexVision, YandexGPT
+from .exercise_matcher import ExerciseMatcher, QuickExerciseMatcher
+from .authentication import USER_PROFILE_CACHE_KEY, invalidate_cached_user
+from .throttling import AIRateThrottle
+from .tasks import (
+    AI_UPLOAD_DIR, blacklist_refresh_token, recognize_workout_speech, speech_to_text_task, analyze_image_task,
+    parse_workout_task, workout_recommendations_task,
+)
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
+
+# Общая сессия для Yandex OAuth: keep-alive и пул соединений вместо TCP+TLS на каждый вход.
+# Один быстрый повтор — на случай, если сервер закрыл простаивавшее keep-alive соединение
+YANDEX_OAUTH_SESSION = http_requests.Session()
+YANDEX_OAUTH_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=32,
+    max_retries=Retry(total=1, backoff_factor=0.1, allowed_methods=frozenset({'GET'})),
+))
+YANDEX_OAUTH_TIMEOUT = (1.0, 3.0)  # (подключение, чтение), секунды
+
+
+# Время жизни access-токена для клиента — из SIMPLE_JWT, чтобы не расходилось с реальным exp
+ACCESS_TOKEN_EXPIRES_IN = int(jwt_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
 
 
 def get_tokens_for_user(user):
@@ -36,43 +80,63 @@ def get_tokens_for_user(user):
     return {
         'accessToken': str(refresh.access_token),
         'refreshToken': str(refresh),
-        'expiresIn': 3600,  # 1 час
+        'expiresIn': ACCESS_TOKEN_EXPIRES_IN,
     }
 
 
-def get_client_ip(request):
-    """Получение IP адреса клиента"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+# Колонки пользователя, нужные для входа: проверка пароля + всё, что читает UserSerializer,
+# и updated_at — часть версии закэшированного профиля
+LOGIN_USER_FIELDS = ('password', 'is_active', 'updated_at', *UserSerializer.MODEL_FIELDS)
+
+
+def _touch_last_login(user):
+    """
+    Обновляет время последнего входа одним узким UPDATE
+    (без перезаписи всех колонок и без сигналов save()).
+    Новое значение сначала пишется в экземпляр: версия профиля в _serialize_user
+    читается уже из него, и ответ входа не может взять старую запись
+    """
+    user.last_login_at = timezone.now()
+    User.objects.filter(pk=user.pk).update(last_login_at=user.last_login_at)
+    # update() не отправляет post_save — сбрасываем кэш аутентификации и профиля вручную,
+    # иначе другие процессы до истечения USER_CACHE_TIMEOUT видели бы прежний last_login_at
+    invalidate_cached_user(user.pk)
+
+
+def _serialize_user(user):
+    """
+    Профиль для ответов входа/регистрации и GET /me/: сериализуется один раз на версию
+    пользователя. Кэш общий для процессов, ключ — pk; вместе с данными хранится версия
+    (updated_at, last_login_at), и запись другой версии считается промахом.
+    Явно запись сбрасывает invalidate_cached_user (сигналы save() и _touch_last_login)
+    """
+    key = USER_PROFILE_CACHE_KEY.format(user.pk)
+    version = (user.updated_at, user.last_login_at)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    data = dict(UserSerializer(user).data)
+    cache.set(key, (version, data), settings.USER_CACHE_TIMEOUT)
+    return data
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register_view(request):
     """Регистрация через email/password"""
-    # Преобразуем возможные camelCase поля от клиента в snake_case
-    data = request.data.copy() if hasattr(request.data, 'copy') else dict(request.data)
-    if 'displayName' in data and 'display_name' not in data:
-        data['display_name'] = data.pop('displayName')
-    if 'photoUrl' in data and 'photo_url' not in data:
-        data['photo_url'] = data.pop('photoUrl')
-    # можно добавить другие маппинги при необходимости
+    # camelCase поля клиента (displayName, photoUrl) переводит сам сериализатор
     serializer = RegisterSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.save()
         tokens = get_tokens_for_user(user)
         
         return Response({
-            'user': UserSerializer(user).data,
+            'user': _serialize_user(user),
             'tokens': tokens,
         }, status=status.HTTP_201_CREATED)
     
-    print("REGISTER FAILED. request.data =", request.data)
-    print("REGISTER ERRORS =", serializer.errors)
+    # Тело запроса не логируем: в нём пароль
+    logger.debug("Register failed: %s", serializer.errors)
 
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -88,177 +152,160 @@ def login_view(request):
     email = serializer.validated_data['email']
     password = serializer.validated_data['password']
     
-    # Аутентификация по email
-    try:
-        user = User.objects.get(email=email)
-        if not user.check_password(password):
-            return Response(
-                {'message': 'Неверный email или пароль'},
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-    except User.DoesNotExist:
+    # Аутентификация по email: читаем только колонки для проверки пароля и ответа
+    user = User.objects.only(*LOGIN_USER_FIELDS).filter(email__iexact=email.strip()).first()
+    if user is None:
+        # Хэшируем пароль и для несуществующего email, чтобы время ответа
+        # не выдавало, зарегистрирован ли адрес (как в ModelBackend)
+        User().set_password(password)
+    
+    # Неактивных не пускаем, как ModelBackend.user_can_authenticate()
+    if user is None or not user.check_password(password) or not user.is_active:
         return Response(
             {'message': 'Неверный email или пароль'},
             status=status.HTTP_401_UNAUTHORIZED
         )
     
     # Обновляем время последнего входа
-    user.last_login_at = datetime.now()
-    user.save()
+    _touch_last_login(user)
     
     tokens = get_tokens_for_user(user)
     
     return Response({
-        'user': UserSerializer(user).data,
+        'user': _serialize_user(user),
         'tokens': tokens,
     })
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def google_login_view(request):
-    """Вход через Google OAuth"""
-    serializer = OAuthSerializer(data=request.data)
-    if not serializer.is_valid():
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+class OAuthError(Exception):
+    """Ошибка провайдера OAuth с готовым сообщением для клиента"""
+
+
+def _google_user(request, validated_data):
+    """Данные пользователя Google: (email, defaults)"""
+    id_token = validated_data.get('id_token')
     
-    id_token = serializer.validated_data.get('id_token')
+    # В продакшене здесь должна быть проверка Google токена
+    # from google.oauth2 import id_token as google_id_token
+    # from google.auth.transport import requests
+    # idinfo = google_id_token.verify_oauth2_token(
+    #     id_token, requests.Request(), settings.GOOGLE_OAUTH_CLIENT_ID
+    # )
     
-    try:
-        # В продакшене здесь должна быть проверка Google токена
-        # from google.oauth2 import id_token as google_id_token
-        # from google.auth.transport import requests
-        # idinfo = google_id_token.verify_oauth2_token(
-        #     id_token, requests.Request(), settings.GOOGLE_OAUTH_CLIENT_ID
-        # )
-        
-        # Для разработки используем мок данные
-        email = request.data.get('email', 'google_user@gmail.com')
-        display_name = request.data.get('display_name', 'Google User')
-        photo_url = request.data.get('photo_url', '')
-        
-        # Найти или создать пользователя
-        user, created = User.objects.get_or_create(
-            email=email,
-            defaults={
-                'username': email,
-                'display_name': display_name,
-                'photo_url': photo_url,
-                'provider': 'google',
-                'email_verified': True,
-            }
-        )
-        
-        user.last_login_at = datetime.now()
-        user.save()
-        
-        tokens = get_tokens_for_user(user)
-        
-        return Response({
-            'user': UserSerializer(user).data,
-            'tokens': tokens,
-        })
+    # Для разработки используем мок данные
+    email = request.data.get('email', 'google_user@gmail.com')
+    display_name = request.data.get('display_name', 'Google User')
+    photo_url = request.data.get('photo_url', '')
     
-    except Exception as e:
-        return Response(
-            {'message': f'Ошибка Google аутентификации: {str(e)}'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    return email, {
+        'username': email,
+        'display_name': display_name,
+        'photo_url': photo_url,
+        'provider': User.Provider.GOOGLE,
+        'email_verified': True,
+    }
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def yandex_login_view(request):
-    """Вход через Yandex OAuth"""
-    serializer = OAuthSerializer(data=request.data)
-    if not serializer.is_valid():
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+def _yandex_user(request, validated_data):
+    """Данные пользователя Yandex: (email, defaults)"""
+    access_token = validated_data.get('access_token')
+    if not access_token:
+        # Без токена не ходим в Yandex и не пишем в БД
+        raise OAuthError('Не передан access_token')
     
-    access_token = serializer.validated_data.get('access_token')
+    # Получение информации о пользователе Yandex
+    response = YANDEX_OAUTH_SESSION.get(
+        'https://login.yandex.ru/info',
+        headers={'Authorization': f'OAuth {access_token}'},
+        timeout=YANDEX_OAUTH_TIMEOUT
+    )
     
-    try:
-        # Получение информации о пользователе Yandex
-        response = http_requests.get(
-            'https://login.yandex.ru/info',
-            headers={'Authorization': f'OAuth {access_token}'}
-        )
-        
-        if response.status_code != 200:
-            return Response(
-                {'message': 'Неверный Yandex токен'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        yandex_user = response.json()
-        email = yandex_user.get('default_email') or f"{yandex_user['id']}@yandex.oauth"
-        
-        user, created = User.objects.get_or_create(
-            email=email,
-            defaults={
-                'username': yandex_user.get('login', email),
-                'display_name': yandex_user.get('display_name', yandex_user.get('login', '')),
-                'provider': 'yandex',
-                'provider_id': yandex_user['id'],
-                'email_verified': True,
-            }
-        )
-        
-        user.last_login_at = datetime.now()
-        user.save()
-        
-        tokens = get_tokens_for_user(user)
-        
-        return Response({
-            'user': UserSerializer(user).data,
-            'tokens': tokens,
-        })
-    except Exception as e:
-        return Response(
-            {'message': f'Ошибка Yandex аутентификации: {str(e)}'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    if response.status_code != 200:
+        raise OAuthError('Неверный Yandex токен')
+    
+    yandex_user = response.json()
+    email = yandex_user.get('default_email') or f"{yandex_user['id']}@yandex.oauth"
+    
+    return email, {
+        'username': yandex_user.get('login', email),
+        'display_name': yandex_user.get('display_name', yandex_user.get('login', '')),
+        'provider': User.Provider.YANDEX,
+        'provider_id': yandex_user['id'],
+        'email_verified': True,
+    }
+
+
+def _vk_user(request, validated_data):
+    """Данные пользователя VK: (email, defaults)"""
+    user_data = validated_data.get('user', {})
+    
+    vk_id = user_data.get('id')
+    if not vk_id:
+        # Иначе был бы создан пользователь vk_None@vk.oauth
+        raise OAuthError('Не передан id пользователя VK')
+    email = user_data.get('email') or f"vk_{vk_id}@vk.oauth"
+    first_name = user_data.get('first_name', '')
+    last_name = user_data.get('last_name', '')
+    display_name = f"{first_name} {last_name}".strip() or f"VK User {vk_id}"
+    
+    return email, {
+        'username': f"vk_{vk_id}",
+        'display_name': display_name,
+        'provider': User.Provider.VK,
+        'provider_id': str(vk_id),
+        'email_verified': bool(user_data.get('email')),
+    }
+
+
+# Провайдер -> (название для сообщений об ошибке, извлечение данных пользователя)
+OAUTH_PROVIDERS = {
+    'google': ('Google', _google_user),
+    'yandex': ('Yandex', _yandex_user),
+    'vk': ('VK', _vk_user),
+}
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
-def vk_login_view(request):
-    """Вход через VK OAuth"""
+def oauth_login_view(request, provider):
+    """Вход через OAuth (Google, Yandex, VK)"""
+    if provider not in OAUTH_PROVIDERS:
+        return Response(
+            {'message': f'Неизвестный OAuth провайдер: {provider}'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
     serializer = OAuthSerializer(data=request.data)
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    user_data = serializer.validated_data.get('user', {})
+    body_provider = serializer.validated_data.get('provider')
+    if body_provider is not None and body_provider != provider:
+        return Response(
+            {'provider': [f'Провайдер в теле ({body_provider}) не совпадает с провайдером в URL ({provider})']},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    provider_name, get_provider_user = OAUTH_PROVIDERS[provider]
     
     try:
-        vk_id = user_data.get('id')
-        email = user_data.get('email') or f"vk_{vk_id}@vk.oauth"
-        first_name = user_data.get('first_name', '')
-        last_name = user_data.get('last_name', '')
-        display_name = f"{first_name} {last_name}".strip() or f"VK User {vk_id}"
-        
-        user, created = User.objects.get_or_create(
-            email=email,
-            defaults={
-                'username': f"vk_{vk_id}",
-                'display_name': display_name,
-                'provider': 'vk',
-                'provider_id': str(vk_id),
-                'email_verified': bool(user_data.get('email')),
-            }
-        )
+        email, defaults = get_provider_user(request, serializer.validated_data)
         
-        user.last_login_at = datetime.now()
-        user.save()
+        # Найти или создать пользователя и отметить вход — один запрос
+        user = User.objects.upsert_oauth(email, defaults=defaults)
+        invalidate_cached_user(user.pk)
         
         tokens = get_tokens_for_user(user)
         
         return Response({
-            'user': UserSerializer(user).data,
+            'user': _serialize_user(user),
             'tokens': tokens,
         })
+    except OAuthError as e:
+        return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response(
-            {'message': f'Ошибка VK аутентификации: {str(e)}'},
+            {'message': f'Ошибка {provider_name} аутентификации: {str(e)}'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
@@ -267,26 +314,40 @@ def vk_login_view(request):
 @permission_classes([IsAuthenticated])
 def logout_view(request):
     """Выход из системы"""
-    try:
-        refresh_token = request.data.get('refresh')
-        if refresh_token:
-            token = RefreshToken(refresh_token)
-            token.blacklist()
+    refresh_token = request.data.get('refresh')
+    if refresh_token:
+        # Сразу проверяем только подпись, срок и тип (UntypedToken не ходит в БД,
+        # в отличие от RefreshToken с проверкой чёрного списка); запись в чёрный список — в фоне
+        try:
+            token = UntypedToken(refresh_token)
+        except TokenError:
+            token = None
+        if token is None or token.get(jwt_settings.TOKEN_TYPE_CLAIM) != RefreshToken.token_type:
+            return Response(
+                {'message': 'Неверный токен'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        return Response({'message': 'Успешный выход'})
-    except Exception as e:
-        return Response(
-            {'message': 'Неверный токен'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+        try:
+            blacklist_refresh_token.delay(refresh_token)
+        except BrokerOperationalError:
+            # Брокер недоступен — это не ошибка клиента: заносим токен в чёрный список сразу
+            logger.warning('Broker unavailable, blacklisting refresh token inline', exc_info=True)
+            blacklist_refresh_token(refresh_token)
+    
+    return Response({'message': 'Успешный выход'})
 
 
 @api_view(['GET', 'PUT', 'PATCH'])
 @permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer])
+@parser_classes([JSONParser])
 def current_user_view(request):
     """Получение и обновление профиля текущего пользователя"""
     if request.method == 'GET':
-        return Response(UserSerializer(request.user).data)
+        # Профиль из общего кэша (_serialize_user); рендерим сами, минуя согласование Response
+        body = JSONRenderer().render(_serialize_user(request.user))
+        return HttpResponse(body, content_type='application/json')
     
     elif request.method in ['PUT', 'PATCH']:
         partial = request.method == 'PATCH'
@@ -306,7 +367,9 @@ def change_password_view(request):
     if serializer.is_valid():
         user = request.user
         user.set_password(serializer.validated_data['new_password'])
-        user.save()
+        # Пишем только хэш пароля (updated_at — auto_now, обновляется вместе с ним);
+        # post_save всё равно сбрасывает кэш аутентификации
+        user.save(update_fields=['password', 'updated_at'])
         
         return Response({'message': 'Пароль успешно изменен'})
     
@@ -322,39 +385,91 @@ def reset_password_view(request):
     if serializer.is_valid():
         email = serializer.validated_data['email']
         
-        try:
-            user = User.objects.get(email=email)
-            # Здесь должна быть логика отправки email
-            # send_password_reset_email(user)
-            
-            return Response({'message': 'Инструкции отправлены на email'})
-        except User.DoesNotExist:
-            # Не раскрываем, существует ли пользователь
-            return Response({'message': 'Инструкции отправлены на email'})
+        # Нужен только id: без создания экземпляра модели
+        user_id = User.objects.filter(email__iexact=email.strip()).values_list('id', flat=True).first()
+        if user_id is not None:
+            # Здесь должна быть логика отправки email — фоновой задачей, чтобы ответ не ждал SMTP
+            # send_password_reset_email.delay(user_id)
+            pass
+        
+        # Ответ одинаковый: не раскрываем, существует ли пользователь
+        return Response({'message': 'Инструкции отправлены на email'})
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def get_app_config(request):
+@lru_cache(maxsize=1)
+def _app_config_json():
     """
-    Возвращает публичные настройки приложения.
-    НЕ возвращайте секретные ключи (SECRET_KEY, API_KEY и т.д.)
+    JSON-тело публичных настроек: settings не меняются во время работы процесса,
+    поэтому словарь собирается и рендерится один раз
     """
     config = {
         'debug': settings.DEBUG,
         'allowed_hosts': settings.ALLOWED_HOSTS,
         # добавьте только публичные настройки
-        'google_oauth_client_id': settings.GOOGLE_OAUTH_CLIENT_ID if hasattr(settings, 'GOOGLE_OAUTH_CLIENT_ID') else None,
-        'yandex_oauth_client_id': settings.YANDEX_OAUTH_CLIENT_ID if hasattr(settings, 'YANDEX_OAUTH_CLIENT_ID') else None,
+        'google_oauth_client_id': getattr(settings, 'GOOGLE_OAUTH_CLIENT_ID', None),
+        'yandex_oauth_client_id': getattr(settings, 'YANDEX_OAUTH_CLIENT_ID', None),
         # НЕ добавляйте SECRET_KEY, YANDEX_GPT_API_KEY и другие секреты
     }
-    return Response(config)
+    return JSONRenderer().render(config)
+
+
+def _app_config_etag(request):
+    """ETag публичных настроек: клиенту с актуальной копией отвечаем 304 без тела"""
+    return hashlib.md5(_app_config_json()).hexdigest()
+
+
+@cache_control(max_age=300, public=True)
+@etag(_app_config_etag)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@authentication_classes([])
+@renderer_classes([JSONRenderer])
+def get_app_config(request):
+    """
+    Возвращает публичные настройки приложения.
+    НЕ возвращайте секретные ключи (SECRET_KEY, API_KEY и т.д.)
+    """
+    # Публичный эндпоинт: JWT не разбираем, отдаём готовые байты
+    return HttpResponse(_app_config_json(), content_type='application/json')
+
+
+# Владелец фоновой AI-задачи: статус и результат отдаём только тому, кто её поставил
+AI_TASK_OWNER_KEY = 'ai_task_owner:{}'
+
+
+def _wants_async(request):
+    """Клиент просит фоновое выполнение (?async=1) и настроен брокер Celery"""
+    return request.query_params.get('async') in ('1', 'true') and not settings.CELERY_TASK_ALWAYS_EAGER
+
+
+def _enqueue_ai_task(request, task, *args):
+    """Ставит AI-задачу в очередь Celery и отвечает 202 с task_id для опроса"""
+    task_id = str(uuid.uuid4())
+    # Владельца записываем до постановки в очередь, чтобы первый опрос не получил 404
+    cache.set(AI_TASK_OWNER_KEY.format(task_id), str(request.user.pk), settings.CELERY_RESULT_EXPIRES)
+    task.apply_async(args, task_id=task_id)
+    return Response({'task_id': task_id, 'status': 'pending'}, status=status.HTTP_202_ACCEPTED)
+
+
+def _enqueue_upload_task(request, task, uploaded_file):
+    """
+    Кладёт загруженный файл в общее хранилище (default_storage), доступное воркеру,
+    и ставит задачу на его обработку. Файл удаляет сама задача (в finally), здесь — если
+    задачу не удалось поставить; задачи, которые так и не выполнились, подчищает purge_ai_uploads
+    """
+    storage_name = default_storage.save(f'{AI_UPLOAD_DIR}/{uuid.uuid4().hex}', uploaded_file)
+    try:
+        return _enqueue_ai_task(request, task, storage_name)
+    except Exception:
+        default_storage.delete(storage_name)
+        raise
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([AIRateThrottle])
 def speech_to_text_view(request):
     """
     Распознавание речи через Yandex SpeechKit с парсингом упражнений
@@ -376,6 +491,7 @@ def speech_to_text_view(request):
         },
         "success": true
     }
+    С ?async=1 — 202 и task_id (см. ai_task_status_view)
     """
     try:
         audio_file = request.FILES.get('audio')
@@ -385,23 +501,12 @@ def speech_to_text_view(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Читаем аудио данные
-        audio_data = audio_file.read()
-        
-        # Распознаём речь
-        text = YandexSpeechKit.recognize_audio(audio_data)
-        
-        # Парсим структурированные данные
-        from .exercise_parser import ExerciseParser
-        parsed_data = ExerciseParser.parse(text)
-        
-        # Добавляем краткое описание подходов
-        if parsed_data.get('sets'):
-            parsed_data['sets_summary'] = ExerciseParser.format_sets_summary(parsed_data['sets'])
+        if _wants_async(request):
+            return _enqueue_upload_task(request, speech_to_text_task, audio_file)
         
+        # Распознаём речь: файл передаём как есть, в память целиком не читаем
         return Response({
-            'text': text,
-            'parsed': parsed_data,
+            **recognize_workout_speech(audio_file),
             'success': True
         })
         
@@ -414,10 +519,12 @@ def speech_to_text_view(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([AIRateThrottle])
 def analyze_image_view(request):
     """
     Анализ изображения через Yandex Vision
     Ожидает image файл в request.FILES
+    С ?async=1 — 202 и task_id (см. ai_task_status_view)
     """
     try:
         image_file = request.FILES.get('image')
@@ -427,11 +534,11 @@ def analyze_image_view(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Читаем данные изображения
-        image_data = image_file.read()
+        if _wants_async(request):
+            return _enqueue_upload_task(request, analyze_image_task, image_file)
         
-        # Анализируем и очищаем текст из изображения
-        cleaned_text = YandexVision.analyze_workout_image(image_data)
+        # Анализируем и очищаем текст из изображения: файл уходит в Vision по чанкам
+        cleaned_text = YandexVision.analyze_workout_image(image_file)
         
         return Response({
             'text': cleaned_text,
@@ -447,11 +554,12 @@ def analyze_image_view(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([AIRateThrottle])
 def parse_workout_text_view(request):
     """
     Парсинг текста тренировки с помощью YandexGPT
     Принимает { "text": "жим лёжа 80кг 10 раз, присед 100кг 8 повторений" }
-    Возвращает структурированные данные
+    Возвращает структурированные данные; с ?async=1 — 202 и task_id (см. ai_task_status_view)
     """
     try:
         text = request.data.get('text', '')
@@ -462,6 +570,9 @@ def parse_workout_text_view(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        if _wants_async(request):
+            return _enqueue_ai_task(request, parse_workout_task, text)
+        
         # Парсим тренировку через YandexGPT
         workout_data = YandexGPT.parse_workout_from_text(text)
         
@@ -479,12 +590,14 @@ def parse_workout_text_view(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([AIRateThrottle])
 def ai_recommendations_view(request):
     """
     AI рекомендации на основе истории тренировок пользователя
     Принимает:
     - { "history": "текстовая история" } или
     - { "workouts": [...], "stats": {...}, "records": {...} }
+    С ?async=1 — 202 и task_id (см. ai_task_status_view)
     """
     try:
         # Поддерживаем оба формата: строка или структурированные данные
@@ -505,6 +618,9 @@ def ai_recommendations_view(request):
                     status=status.HTTP_400_BAD_REQUEST
                 )
         
+        if _wants_async(request):
+            return _enqueue_ai_task(request, workout_recommendations_task, user_history)
+        
         # Генерируем рекомендации
         recommendations = YandexGPT.generate_workout_recommendations(user_history)
         
@@ -520,8 +636,43 @@ def ai_recommendations_view(request):
         )
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def ai_task_status_view(request, task_id):
+    """
+    Статус фоновой AI-задачи
+    
+    GET /api/auth/tasks/<task_id>/
+    
+    Возвращает:
+    {"task_id": "uuid", "status": "pending" | "started" | "success" | "failure", "result": ...}
+    """
+    task_id = str(task_id)
+    if cache.get(AI_TASK_OWNER_KEY.format(task_id)) != str(request.user.pk):
+        return Response(
+            {'message': 'Задача не найдена', 'error': 'TASK_NOT_FOUND'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    result = AsyncResult(task_id)
+    if result.successful():
+        return Response({'task_id': task_id, 'status': 'success', 'result': result.result})
+    if result.failed():
+        return Response({'task_id': task_id, 'status': 'failure', 'message': str(result.result)})
+    
+    return Response({
+        'task_id': task_id,
+        'status': 'pending' if result.state == 'PENDING' else 'started',
+    })
+
+
 # ========== API для работы с упражнениями ==========
 
+# Число записей истории пользователя: кэшируется, сбрасывается при подтверждении упражнения
+EXERCISE_LOG_COUNT_KEY = 'exercise_log_count:{}'
+EXERCISE_LOG_COUNT_TIMEOUT = 300
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def match_exercise_view(request):
@@ -624,45 +775,47 @@ def confirm_exercise_view(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Создаём лог использования
-    log = UserExerciseLog.objects.create(
-        user=request.user,
-        exercise=exercise,
-        recognized_text=serializer.validated_data['recognized_text'],
-        confidence_score=serializer.validated_data.get('confidence_score'),
-        similarity_score=serializer.validated_data.get('similarity_score'),
-        duration_seconds=serializer.validated_data.get('duration_seconds'),
-        repetitions_done=serializer.validated_data.get('repetitions_done'),
-        completed=serializer.validated_data.get('completed', False),
-        user_rating=serializer.validated_data.get('user_rating'),
-        user_notes=serializer.validated_data.get('user_notes', ''),
-    )
-    
-    # Обновляем счётчик использования упражнения
-    exercise.usage_count += 1
-    exercise.save(update_fields=['usage_count'])
-    
-    # Если это новый вариант названия с высокой схожестью, добавляем как алиас
     recognized_text = serializer.validated_data['recognized_text']
     similarity_score = serializer.validated_data.get('similarity_score', 0.0)
     
-    if similarity_score >= 0.7:
-        normalized_text = ExerciseMatcher.normalize_text(recognized_text)
-        
-        # Проверяем, не существует ли уже такой алиас
-        existing_aliases = exercise.aliases.filter(alias__iexact=normalized_text)
-        if not existing_aliases.exists():
-            # Создаём новый алиас
-            ExerciseAlias.objects.create(
-                exercise=exercise,
-                alias=normalized_text,
-                match_count=1
-            )
-        else:
-            # Обновляем счётчик существующего алиаса
-            alias = existing_aliases.first()
-            alias.match_count += 1
-            alias.save(update_fields=['match_count'])
+    with transaction.atomic():
+        # Новая запись истории — сбрасываем закэшированное число записей после коммита
+        count_key = EXERCISE_LOG_COUNT_KEY.format(request.user.pk)
+        transaction.on_commit(lambda: cache.delete(count_key))
+        
+        # Создаём лог использования
+        log = UserExerciseLog.objects.create(
+            user=request.user,
+            exercise=exercise,
+            recognized_text=recognized_text,
+            confidence_score=serializer.validated_data.get('confidence_score'),
+            similarity_score=serializer.validated_data.get('similarity_score'),
+            duration_seconds=serializer.validated_data.get('duration_seconds'),
+            repetitions_done=serializer.validated_data.get('repetitions_done'),
+            completed=serializer.validated_data.get('completed', False),
+            user_rating=serializer.validated_data.get('user_rating'),
+            user_notes=serializer.validated_data.get('user_notes', ''),
+        )
+        
+        # Счётчики увеличиваем на стороне БД (F-выражение): без гонки read-modify-write
+        Exercise.objects.filter(pk=exercise.pk).update(usage_count=F('usage_count') + 1)
+        exercise.usage_count += 1
+        
+        # Если это новый вариант названия с высокой схожестью, добавляем как алиас
+        if similarity_score >= 0.7:
+            normalized_text = ExerciseMatcher.normalize_text(recognized_text)
+            
+            # Обычно алиас уже есть — тогда хватает одного UPDATE
+            updated = exercise.aliases.filter(alias=normalized_text).update(match_count=F('match_count') + 1)
+            if not updated:
+                _, created = ExerciseAlias.objects.get_or_create(
+                    exercise=exercise,
+                    alias=normalized_text,
+                    defaults={'match_count': 1}
+                )
+                if not created:
+                    # Алиас успел создать параллельный запрос
+                    exercise.aliases.filter(alias=normalized_text).update(match_count=F('match_count') + 1)
     
     return Response({
         'message': 'Упражнение успешно подтверждено',
@@ -705,7 +858,7 @@ def exercise_detail_view(request, exercise_id):
     GET /api/exercises/{exercise_id}/
     """
     try:
-        exercise = Exercise.objects.get(id=exercise_id, is_active=True)
+        exercise = ExerciseSerializer.setup_eager_loading(Exercise.objects).get(id=exercise_id, is_active=True)
     except Exercise.DoesNotExist:
         return Response(
             {'message': 'Упражнение не найдено', 'error': 'EXERCISE_NOT_FOUND'},
@@ -726,8 +879,24 @@ def user_exercise_history_view(request):
     limit = int(request.query_params.get('limit', 20))
     offset = int(request.query_params.get('offset', 0))
     
-    logs = UserExerciseLog.objects.filter(user=request.user)[offset:offset+limit]
-    total_count = UserExerciseLog.objects.filter(user=request.user).count()
+    user_logs = UserExerciseLog.objects.filter(user=request.user)
+    # Порядок -created_at из Meta.ordering обслуживает индекс (user, -created_at)
+    page = UserExerciseLogSerializer.setup_eager_loading(user_logs)
+    count_key = EXERCISE_LOG_COUNT_KEY.format(request.user.pk)
+    total_count = cache.get(count_key)
+    
+    if total_count is not None:
+        # Число известно: запрос страницы останавливается на LIMIT, без подсчёта всех строк
+        logs = list(page[offset:offset+limit])
+    else:
+        # Общее число считаем тем же запросом: COUNT(*) OVER () вычисляется до LIMIT/OFFSET
+        logs = list(page.annotate(total_count=Window(Count('id')))[offset:offset+limit])
+        if logs:
+            total_count = logs[0].total_count
+        else:
+            # Пустая страница: окно не вернуло строк, считаем отдельно (только если это не начало списка)
+            total_count = user_logs.count() if offset else 0
+        cache.set(count_key, total_count, EXERCISE_LOG_COUNT_TIMEOUT)
     
     return Response({
         'history': UserExerciseLogSerializer(logs, many=True).data,
@@ -737,30 +906,37 @@ def user_exercise_history_view(request):
     })
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def exercise_categories_view(request):
-    """
-    Получение списка всех категорий упражнений
-    
-    GET /api/exercises/categories/
-    """
+@lru_cache(maxsize=1)
+def _exercise_categories_json():
+    """JSON-тело списка категорий: choices — константы класса, рендерим один раз на процесс"""
     categories = [
         {'value': cat[0], 'label': cat[1]}
-        for cat in Exercise.CATEGORY_CHOICES
+        for cat in Exercise.Category.choices
     ]
     
     difficulties = [
         {'value': diff[0], 'label': diff[1]}
-        for diff in Exercise.DIFFICULTY_CHOICES
+        for diff in Exercise.Difficulty.choices
     ]
     
-    return Response({
+    return JSONRenderer().render({
         'categories': categories,
         'difficulties': difficulties
     })
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer])
+def exercise_categories_view(request):
+    """
+    Получение списка всех категорий упражнений
+    
+    GET /api/exercises/categories/
+    """
+    return HttpResponse(_exercise_categories_json(), content_type='application/json')
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def quick_match_exercise_view(request):
@@ -796,10 +972,7 @@ def quick_match_exercise_view(request):
         "processing_time_ms": 45
     }
     """
-    import time
-    from .exercise_matcher import QuickExerciseMatcher
-    
-    start_time = time.time()
+    start_time = time.perf_counter()
     
     # Валидация
     text = request.data.get('text', '').strip()
@@ -817,8 +990,8 @@ def quick_match_exercise_view(request):
     
     # Поиск совпадений
     try:
-        matcher = QuickExerciseMatcher()
-        matches = matcher.find_matches(
+        # Матчер целиком на classmethod'ах, индекс вариантов закэширован — экземпляр не нужен
+        matches = QuickExerciseMatcher.find_matches(
             text=text,
             language=language,
             max_results=max_results
@@ -829,7 +1002,7 @@ def quick_match_exercise_view(request):
         if matches and matches[0]['similarity'] >= QuickExerciseMatcher.EXACT_THRESHOLD:
             exact_match = True
         
-        processing_time = int((time.time() - start_time) * 1000)
+        processing_time = int((time.perf_counter() - start_time) * 1000)
         
         return Response({
             "matches": matches,
@@ -839,9 +1012,7 @@ def quick_match_exercise_view(request):
         })
         
     except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Quick match error: {str(e)}", exc_info=True)
+        logger.exception("Quick match error: %s", e)
         
         return Response(
             {"error": "Ошибка поиска упражнений"},
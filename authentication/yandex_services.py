@@ -6,7 +6,9 @@
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import base64
+import json
 import subprocess
 import tempfile
 import os
@@ -16,6 +18,11 @@ from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+# Общая сессия для Yandex Cloud (SpeechKit, Vision, GPT): keep-alive и пул соединений
+# на каждый хост вместо нового TCP+TLS на каждый вызов. POST не повторяем — запросы платные
+YANDEX_CLOUD_SESSION = requests.Session()
+YANDEX_CLOUD_SESSION.mount('https://', HTTPAdapter(pool_connections=3, pool_maxsize=32))
+
 
 class YandexSpeechKit:
     """Сервис для распознавания речи через Yandex SpeechKit"""
@@ -23,17 +30,17 @@ class YandexSpeechKit:
     BASE_URL = 'https://stt.api.cloud.yandex.net/speech/v1/stt:recognize'
     
     @classmethod
-    def convert_to_oggopus(cls, audio_data):
+    def convert_to_oggopus(cls, audio_file):
         """
         Конвертация AAC/M4A → OggOpus для Yandex SpeechKit
         
         Args:
-            audio_data: байтовые данные AAC аудио
+            audio_file: загруженный файл AAC аудио (UploadedFile)
             
         Returns:
             bytes: байтовые данные OggOpus
         """
-        logger.info(f"Starting audio conversion, input size: {len(audio_data)} bytes")
+        logger.info("Starting audio conversion, input size: %d bytes", audio_file.size)
         
         # Определяем путь к FFmpeg
         ffmpeg_path = shutil.which('ffmpeg') or '/usr/bin/ffmpeg'
@@ -51,23 +58,29 @@ class YandexSpeechKit:
             )
             if ffmpeg_check.returncode != 0:
                 raise Exception("FFmpeg не установлен или не работает")
-            logger.info(f"FFmpeg найден: {ffmpeg_path} - {ffmpeg_check.stdout.decode('utf-8').splitlines()[0]}")
+            logger.info("FFmpeg найден: %s - %s", ffmpeg_path, ffmpeg_check.stdout.decode('utf-8').splitlines()[0])
         except FileNotFoundError:
             raise Exception(f"FFmpeg не найден по пути {ffmpeg_path}")
         except subprocess.TimeoutExpired:
             raise Exception("FFmpeg не отвечает")
         
-        # Создаём временный файл для входного AAC
-        with tempfile.NamedTemporaryFile(suffix='.m4a', delete=False) as input_file:
-            input_file.write(audio_data)
-            input_path = input_file.name
+        # Входной файл для FFmpeg: большой upload Django уже сохранил на диск — берём его как есть,
+        # маленький (в памяти) пишем во временный файл по чанкам, без копии всего файла в bytes
+        owns_input = not hasattr(audio_file, 'temporary_file_path')
+        if owns_input:
+            with tempfile.NamedTemporaryFile(suffix='.m4a', delete=False) as input_file:
+                for chunk in audio_file.chunks():
+                    input_file.write(chunk)
+                input_path = input_file.name
+        else:
+            input_path = audio_file.temporary_file_path()
         
         # Создаём временный файл для выходного OggOpus
         with tempfile.NamedTemporaryFile(suffix='.ogg', delete=False) as output_file:
             output_path = output_file.name
         
         try:
-            logger.info(f"Converting: {input_path} → {output_path}")
+            logger.info("Converting: %s → %s", input_path, output_path)
             
             # FFmpeg команда: AAC -> Ogg (Opus) в ogg-контейнере
             result = subprocess.run([
@@ -83,8 +96,8 @@ class YandexSpeechKit:
                 output_path
             ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=30)
             
-            logger.info(f"FFmpeg stdout: {result.stdout.decode('utf-8', errors='ignore')[:500]}")
-            logger.info(f"FFmpeg stderr: {result.stderr.decode('utf-8', errors='ignore')[:500]}")
+            logger.debug("FFmpeg stdout: %s", result.stdout[:500].decode('utf-8', errors='ignore'))
+            logger.debug("FFmpeg stderr: %s", result.stderr[:500].decode('utf-8', errors='ignore'))
             
             # Проверяем, что файл создан и не пустой
             if not os.path.exists(output_path):
@@ -98,12 +111,12 @@ class YandexSpeechKit:
             with open(output_path, 'rb') as f:
                 opus_data = f.read()
             
-            logger.info(f"✅ Conversion successful: {len(audio_data)} → {len(opus_data)} bytes")
+            logger.info("✅ Conversion successful: %d → %d bytes", audio_file.size, len(opus_data))
             return opus_data
             
         except subprocess.CalledProcessError as e:
             error_msg = e.stderr.decode('utf-8', errors='ignore') if e.stderr else 'Unknown error'
-            logger.error(f"❌ FFmpeg conversion failed (exit code {e.returncode}): {error_msg}")
+            logger.error("❌ FFmpeg conversion failed (exit code %s): %s", e.returncode, error_msg)
             raise Exception(f'FFmpeg conversion failed: {error_msg[:500]}')
         
         except subprocess.TimeoutExpired:
@@ -113,20 +126,20 @@ class YandexSpeechKit:
         finally:
             # Удаляем временные файлы
             try:
-                if os.path.exists(input_path):
+                if owns_input and os.path.exists(input_path):
                     os.unlink(input_path)
                 if os.path.exists(output_path):
                     os.unlink(output_path)
             except Exception as cleanup_error:
-                logger.warning(f"Cleanup error: {cleanup_error}")
+                logger.warning("Cleanup error: %s", cleanup_error)
     
     @classmethod
-    def recognize_audio(cls, audio_data, lang='ru-RU'):
+    def recognize_audio(cls, audio_file, lang='ru-RU'):
         """
         Распознать аудио файл с автоматической конвертацией
         
         Args:
-            audio_data: байтовые данные аудио (AAC/M4A)
+            audio_file: загруженный файл аудио (AAC/M4A), читается по чанкам
             lang: язык распознавания (по умолчанию ru-RU)
             
         Returns:
@@ -135,18 +148,18 @@ class YandexSpeechKit:
         if not settings.YANDEX_GPT_API_KEY or not settings.YANDEX_GPT_FOLDER_ID:
             raise Exception('Yandex API ключи не настроены')
         
-        logger.info(f"Starting speech recognition, input size: {len(audio_data)} bytes")
+        logger.info("Starting speech recognition, input size: %d bytes", audio_file.size)
         
         # Конвертируем AAC → OggOpus
         opus_data = None
         conversion_error = None
         
         try:
-            opus_data = cls.convert_to_oggopus(audio_data)
-            logger.info(f"✅ Audio conversion successful: {len(audio_data)} → {len(opus_data)} bytes")
+            opus_data = cls.convert_to_oggopus(audio_file)
+            logger.info("✅ Audio conversion successful: %d → %d bytes", audio_file.size, len(opus_data))
         except Exception as e:
             conversion_error = str(e)
-            logger.error(f"❌ Audio conversion failed: {e}")
+            logger.error("❌ Audio conversion failed: %s", e)
         
         # Если конвертация не удалась — возвращаем понятную ошибку
         if opus_data is None:
@@ -164,25 +177,25 @@ class YandexSpeechKit:
             'lang': lang,
         }
         
-        logger.info(f"Sending {len(opus_data)} bytes to Yandex SpeechKit")
+        logger.info("Sending %d bytes to Yandex SpeechKit", len(opus_data))
         
-        response = requests.post(
+        response = YANDEX_CLOUD_SESSION.post(
             cls.BASE_URL,
             headers=headers,
             params=params,
             data=opus_data,
-            timeout=30
+            timeout=(3, 30)
         )
         
-        logger.info(f"Yandex SpeechKit response: {response.status_code}")
+        logger.info("Yandex SpeechKit response: %s", response.status_code)
         
         if response.status_code == 200:
             result = response.json()
             text = result.get('result', '')
-            logger.info(f"Recognition successful: '{text}'")
+            logger.debug("Recognition successful: '%s'", text)
             return text
         else:
-            logger.error(f"SpeechKit error: {response.status_code} - {response.text}")
+            logger.error("SpeechKit error: %s - %s", response.status_code, response.text)
             raise Exception(f'SpeechKit error ({response.status_code}): {response.text}')
 
 
@@ -191,13 +204,43 @@ class YandexVision:
     
     BASE_URL = 'https://vision.api.cloud.yandex.net/vision/v1/batchAnalyze'
     
+    # Кратно 3 байтам: base64 соседних кусков склеивается без паддинга в середине
+    CHUNK_SIZE = 3 * 16 * 1024
+    
     @classmethod
-    def analyze_image(cls, image_data, features=None):
+    def request_body(cls, image_file, features):
+        """
+        Тело batchAnalyze по частям: JSON-обёртка и base64 изображения кусками.
+        Ни файл, ни его base64 не лежат в памяти целиком — requests отправляет генератор chunked
+        """
+        # Обёртка собирается явно: content — последнее поле, его строка открывается в prefix
+        prefix = '{"folderId": %s, "analyze_specs": [{"features": %s, "content": "' % (
+            json.dumps(settings.YANDEX_GPT_FOLDER_ID),
+            json.dumps(features),
+        )
+        yield prefix.encode()
+        
+        # chunks() не обязан отдавать куски ровно по CHUNK_SIZE (последний кусок, файлы
+        # на диске), поэтому добираем до границы 3 байт: паддинг '=' только в конце строки
+        pending = b''
+        for chunk in image_file.chunks(cls.CHUNK_SIZE):
+            data = pending + chunk
+            cut = len(data) - len(data) % 3
+            if cut:
+                yield base64.b64encode(data[:cut])
+            pending = data[cut:]
+        if pending:
+            yield base64.b64encode(pending)
+        
+        yield b'"}]}'
+    
+    @classmethod
+    def analyze_image(cls, image_file, features=None):
         """
         Анализ изображения
         
         Args:
-            image_data: байтовые данные изображения
+            image_file: файл изображения (UploadedFile / File), читается по чанкам
             features: список типов анализа (по умолчанию TEXT_DETECTION)
             
         Returns:
@@ -214,21 +257,11 @@ class YandexVision:
             'Content-Type': 'application/json',
         }
         
-        # Конвертируем изображение в base64
-        image_base64 = base64.b64encode(image_data).decode('utf-8')
-        
-        body = {
-            'folderId': settings.YANDEX_GPT_FOLDER_ID,
-            'analyze_specs': [{
-                'content': image_base64,
-                'features': features
-            }]
-        }
-        
-        response = requests.post(
+        response = YANDEX_CLOUD_SESSION.post(
             cls.BASE_URL,
             headers=headers,
-            json=body
+            data=cls.request_body(image_file, features),
+            timeout=(3, 60)
         )
         
         if response.status_code == 200:
@@ -237,17 +270,17 @@ class YandexVision:
             raise Exception(f'Vision error ({response.status_code}): {response.text}')
     
     @classmethod
-    def extract_text_from_image(cls, image_data):
+    def extract_text_from_image(cls, image_file):
         """
         Извлечь текст из изображения
         
         Args:
-            image_data: байтовые данные изображения
+            image_file: файл изображения
             
         Returns:
             str: извлеченный текст
         """
-        result = cls.analyze_image(image_data)
+        result = cls.analyze_image(image_file)
         
         try:
             texts = []
@@ -268,12 +301,12 @@ class YandexVision:
             raise Exception(f'Ошибка парсинга результата Vision: {str(e)}')
     
     @classmethod
-    def analyze_workout_image(cls, image_data):
+    def analyze_workout_image(cls, image_file):
         """
         Анализ изображения тренировки с очисткой и структурированием текста
         
         Args:
-            image_data: байтовые данные изображения
+            image_file: файл изображения (UploadedFile / File)
             
         Returns:
             str: очищенный текст тренировки
@@ -281,7 +314,7 @@ class YandexVision:
         from .yandex_services import YandexGPT
         
         # Сначала извлекаем текст из изображения
-        raw_text = cls.extract_text_from_image(image_data)
+        raw_text = cls.extract_text_from_image(image_file)
         
         if not raw_text.strip():
             return ""
@@ -363,10 +396,11 @@ class YandexGPT:
             'messages': messages
         }
         
-        response = requests.post(
+        response = YANDEX_CLOUD_SESSION.post(
             cls.BASE_URL,
             headers=headers,
-            json=body
+            json=body,
+            timeout=(3, 60)
         )
         
         if response.status_code == 200:
@@ -0,0 +1,13 @@
+"""
+Celery приложение проекта: фоновые задачи, вынесенные из обработки запроса
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+app = Celery('config')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
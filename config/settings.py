@@ -52,6 +52,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party apps
     'rest_framework',
@@ -72,6 +73,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'authentication.middleware.ClientIPMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -106,10 +108,65 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default=''),
         'HOST': config('DB_HOST', default=''),
         'PORT': config('DB_PORT', default=''),
+        # Постоянные соединения: без повторного TCP/auth-рукопожатия на каждый запрос
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
+# Celery
+# https://docs.celeryq.dev/en/stable/django/first-steps-with-django.html
+
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default=REDIS_URL)
+CELERY_TASK_IGNORE_RESULT = True
+# Результаты хранят только задачи, которые клиент опрашивает (AI-запросы с ?async=1)
+CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default=CELERY_BROKER_URL)
+CELERY_RESULT_EXPIRES = 3600
+# Запросы к Yandex AI — в отдельную очередь 'ai', чтобы долгие вызовы не задерживали
+# служебные задачи (blacklist токенов) в очереди по умолчанию
+CELERY_TASK_ROUTES = {
+    'authentication.tasks.speech_to_text_task': {'queue': 'ai'},
+    'authentication.tasks.analyze_image_task': {'queue': 'ai'},
+    'authentication.tasks.parse_workout_task': {'queue': 'ai'},
+    'authentication.tasks.workout_recommendations_task': {'queue': 'ai'},
+}
+# Без брокера задачи выполняются синхронно в процессе запроса (локальная разработка)
+CELERY_TASK_ALWAYS_EAGER = not CELERY_BROKER_URL
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.0/topics/auth/passwords/#using-argon2-with-django
+# Новые пароли хэшируются Argon2id; старые PBKDF2-хэши проверяются и перехэшируются при входе
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -159,11 +216,15 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_THROTTLE_RATES': {
+        # Эндпоинты Yandex AI (authentication.throttling.AIRateThrottle), на пользователя
+        'ai': config('AI_THROTTLE_RATE', default='10/min'),
+    },
 }
 
 # Simple JWT settings
@@ -178,6 +239,12 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Сколько секунд пользователь хранится в кэше JWT-аутентификации
+USER_CACHE_TIMEOUT = config('USER_CACHE_TIMEOUT', default=300, cast=int)
+
+# Сколько секунд индексы вариантов упражнений и версия поиска хранятся в кэше
+EXERCISE_INDEX_CACHE_TIMEOUT = config('EXERCISE_INDEX_CACHE_TIMEOUT', default=300, cast=int)
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # Для разработки. В продакшене укажите конкретные домены
 CORS_ALLOW_CREDENTIALS = True
@@ -198,3 +265,6 @@ YANDEX_GPT_API_KEY = config('YANDEX_GPT_API_KEY', default='')
 YANDEX_GPT_FOLDER_ID = config('YANDEX_GPT_FOLDER_ID', default='')
 CHATGPT_API_KEY = config('CHATGPT_API_KEY', default='')
 DEEPSEEK_API_KEY = config('DEEPSEEK_API_KEY', default='')
+
+# Сопоставление упражнений: базовый скорер схожести ('indel' или 'jaro_winkler')
+EXERCISE_MATCH_SCORER = config('EXERCISE_MATCH_SCORER', default='indel')
@@ -2,7 +2,9 @@
 Тесты для парсера упражнений
 """
 
-from authentication.exercise_parser import ExerciseParser
+import re
+
+from authentication.exercise_parser import ExerciseParser, build_trie_pattern
 
 
 def test_simple_pattern():
@@ -103,6 +105,22 @@ def test_unstructured():
     assert len(result['sets']) == 0
 
 
+def test_number_words_pattern():
+    """Тест префиксного паттерна для числительных"""
+    
+    assert build_trie_pattern(['два', 'две', 'двух']) == 'дв(?:а|е|ух)'
+    
+    number_re = re.compile(r'(?:' + ExerciseParser._NUMBER_ALT + r')')
+    for word in ExerciseParser.NUMBER_WORDS:
+        assert number_re.fullmatch(word), word
+    assert not number_re.fullmatch('дв')
+    
+    # "два" — префикс "двадцать": должен выбираться полный вариант
+    result = ExerciseParser.parse("выпады два подхода по двадцать раз")
+    assert len(result['sets']) == 2
+    assert result['sets'][0]['reps'] == 20
+
+
 if __name__ == '__main__':
     print("=" * 60)
     print("ТЕСТИРОВАНИЕ ПАРСЕРА УПРАЖНЕНИЙ")
@@ -111,6 +129,7 @@ if __name__ == '__main__':
     test_simple_pattern()
     test_complex_pattern()
     test_unstructured()
+    test_number_words_pattern()
     
     print("\n" + "=" * 60)
     print("✅ ВСЕ ТЕСТЫ ПРОЙДЕНЫ")